@@ -1,32 +1,304 @@
 import streamlit as st
+import atexit
 import json
+import os
+import re
 import time
-import random
-from typing import Dict, Any, Optional
+import threading
+import functools
+import importlib.util
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils import serialization
+from utils.llm_cache import get_llm_cache, get_semantic_cache, SEMANTIC_CACHE_AVAILABLE
+from ai_providers.rate_limiter import TokenBucket
+from ai_providers.circuit_breaker import CircuitBreaker
+from ai_providers.key_pool import ClientPool
+
+def _installed(name: str) -> bool:
+    """Check whether a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+# Provider SDKs are slow to import, so setup_api_clients imports them only for providers with a key
+OPENAI_AVAILABLE = _installed("openai")
+ANTHROPIC_AVAILABLE = _installed("anthropic")
+GOOGLE_AVAILABLE = _installed("google.generativeai")
 
-# Import AI providers with error handling
 try:
-    import openai
-    OPENAI_AVAILABLE = True
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
 except ImportError:
-    OPENAI_AVAILABLE = False
+    TIKTOKEN_AVAILABLE = False
+
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
 try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
+    import httpx
+    HTTPX_AVAILABLE = True
 except ImportError:
-    ANTHROPIC_AVAILABLE = False
+    HTTPX_AVAILABLE = False
 
+# Lenient parser for the trailing commas, comments and unquoted keys models sometimes emit
 try:
-    import google.generativeai as genai
-    GOOGLE_AVAILABLE = True
+    import json5
+    JSON5_AVAILABLE = True
 except ImportError:
-    GOOGLE_AVAILABLE = False
+    JSON5_AVAILABLE = False
+
+def _create_http_client():
+    """Build the pooled HTTP client shared by every provider SDK instance"""
+    return httpx.Client(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+
+# One keep-alive pool for all providers avoids a TCP + TLS handshake per call
+_HTTP_CLIENT = _create_http_client() if HTTPX_AVAILABLE else None
+if _HTTP_CLIENT is not None:
+    atexit.register(_HTTP_CLIENT.close)
+
+# Re-touch provider hosts this often so idle pooled sockets are not dropped between user actions
+KEEPALIVE_INTERVAL_SECONDS = 60
+# Stop re-touching once no real request has been made for this long
+KEEPALIVE_IDLE_WINDOW_SECONDS = 600
+
+@functools.lru_cache(maxsize=8)
+def _enc(model: Optional[str] = None):
+    """BPE encoder for a model, built once per process; non-OpenAI models use cl100k_base
+
+    Returns None when the encoding can't be loaded (tiktoken downloads it on first use).
+    """
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def _count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Approximate token count for providers that don't report usage"""
+    encoder = _enc(model) if TIKTOKEN_AVAILABLE else None
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(text) // 4
+
+def _gemini_tokens(prompt: str, response) -> int:
+    """Prefer Gemini's reported usage, falling back to a local estimate"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage and getattr(usage, 'total_token_count', 0):
+        return usage.total_token_count
+    return _count_tokens(prompt) + _count_tokens(response.text)
+
+# OpenAI and Anthropic only cache prompt prefixes of at least this many tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+def _openai_messages(prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+    """Chat messages with the shared context first so OpenAI's automatic prefix caching applies"""
+    if system_prompt:
+        return [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+    return [{"role": "user", "content": prompt}]
+
+def _anthropic_system(system_prompt: Optional[str]) -> Dict[str, Any]:
+    """System block, marked cacheable when it is long enough for Anthropic to cache it"""
+    if not system_prompt:
+        return {}
+    block = {"type": "text", "text": system_prompt}
+    if _count_tokens(system_prompt) >= PROMPT_CACHE_MIN_TOKENS:
+        block["cache_control"] = {"type": "ephemeral"}
+    return {"system": [block]}
+
+def _gemini_prompt(prompt: str, system_prompt: Optional[str]) -> str:
+    """Gemini models are cached per name, so the shared context is sent as a prompt prefix"""
+    return f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+
+# Default per-provider quotas (requests/min, tokens/min); override with e.g. OPENAI_RPM / OPENAI_TPM secrets
+DEFAULT_RATE_LIMITS = {
+    "openai": (500, 90000),
+    "anthropic": (50, 40000),
+    "gemini": (360, 1000000),
+}
+
+# Model prefix -> provider, in fallback order, with the model used when falling back to it
+MODEL_ROUTES = (
+    ("gpt", "openai", "gpt-4"),
+    ("gemini", "gemini", "gemini-1.5-pro"),
+    ("claude", "anthropic", "claude-3-5-sonnet-20240620"),
+)
+
+# Context window sizes used for pre-flight checks
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-turbo-preview": 128000,
+    "gpt-3.5-turbo": 16385,
+    "claude-3-5-sonnet-20240620": 200000,
+    "gemini-1.5-pro": 2000000,
+    "gemini-1.5-flash": 1000000,
+}
+# Largest completion each model accepts per request (gpt-4 is held to half its window to leave room for the prompt)
+MODEL_MAX_OUTPUT_TOKENS = {
+    "gpt-4": 4096,
+    "gpt-4-turbo-preview": 4096,
+    "gpt-3.5-turbo": 4096,
+    "claude-3-5-sonnet-20240620": 4096,
+    "gemini-1.5-pro": 8192,
+    "gemini-1.5-flash": 8192,
+}
+
+# Simple requests (short prompt, short output) don't need the flagship model
+CHEAP_MODEL_ROUTES = {
+    "gpt-4": "gpt-3.5-turbo",
+    "gemini-1.5-pro": "gemini-1.5-flash",
+}
+CHEAP_ROUTE_MAX_PROMPT = 200
+CHEAP_ROUTE_MAX_OUTPUT = 500
+
+# AI responses often wrap the JSON payload in prose; decode the top-level bracketed spans
+_JSON_DECODER = json.JSONDecoder()
+_JSON_START = re.compile(r'[\{\[]')
+# Most models that add prose put the payload in a ```json fence, which can be parsed directly
+_JSON_FENCE = re.compile(r'```(?:json)?\s*([\{\[].*?[\}\]])\s*```', re.DOTALL)
+_TRAILING_COMMA = re.compile(r',\s*([\}\]])')
+
+# OpenAI models that reject response_format={"type": "json_object"}
+JSON_MODE_UNSUPPORTED = frozenset({"gpt-4", "gpt-4-0314", "gpt-4-0613", "gpt-4-32k"})
+
+# Accepted secret names (lowercased) for each provider's API key
+_ALIAS_MAP = {
+    "openai_api_key": "openai",
+    "openai_key": "openai",
+    "google_api_key": "gemini",
+    "gemini_api_key": "gemini",
+    "anthropic_api_key": "anthropic",
+    "anthropic_key": "anthropic",
+}
+
+# Transient provider errors worth retrying; auth and bad-request errors fail immediately.
+# Matched by class name so the SDKs need not be imported to build the retry policy.
+_RETRYABLE_ERRORS = frozenset({
+    "RateLimitError", "APIConnectionError",                               # openai / anthropic
+    "ResourceExhausted", "ServiceUnavailable", "InternalServerError",     # google.api_core
+})
+
+def _json_spans(content: str) -> List[Any]:
+    """JSON values embedded in text, in order; brackets inside an already decoded value are skipped"""
+    spans = []
+    end = 0
+    for match in _JSON_START.finditer(content):
+        if match.start() < end:
+            continue
+        try:
+            data, end = _JSON_DECODER.raw_decode(content, match.start())
+        except ValueError:
+            continue
+        spans.append(data)
+    return spans
+
+def _is_retryable(error: BaseException) -> bool:
+    """Rate limits, connection problems and any 5xx (including Anthropic's 529 overloaded)"""
+    if any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(error).__mro__):
+        return True
+    status = getattr(error, 'status_code', None)
+    return isinstance(status, int) and status >= 500
+
+_backoff_with_jitter = wait_exponential_jitter(initial=1, max=30)
+
+def _wait_for_retry(retry_state) -> float:
+    """Honor a rate-limit Retry-After header, otherwise back off exponentially with jitter"""
+    error = retry_state.outcome.exception()
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return min(float(retry_after), 60.0)
+        except ValueError:
+            pass
+    return _backoff_with_jitter(retry_state)
+
+def _cache_policy(use_cache: Optional[bool], temperature: float) -> Tuple[bool, bool]:
+    """(read, write) for the response cache
+
+    None caches only temperature-0 calls, since sampled output should differ per
+    request; False skips the lookup but stores the fresh result (regenerate).
+    """
+    if use_cache is None:
+        deterministic = temperature == 0
+        return deterministic, deterministic
+    return use_cache, True
+
+PROVIDER_LABELS = {"openai": "OpenAI", "anthropic": "Anthropic", "gemini": "Gemini"}
+
+_provider_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=_wait_for_retry,
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+
+class StreamingResponse:
+    """Iterable of text chunks; the final result dict is available as .result once iteration ends"""
+
+    def __init__(self, chunks, model: str, provider: Optional[str] = None, on_complete=None, on_error=None):
+        self._chunks = chunks
+        self._model = model
+        self._provider = provider
+        self._on_complete = on_complete
+        self._on_error = on_error
+        self.usage: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def failed(cls, error: str, model: str) -> 'StreamingResponse':
+        """A response that yields nothing because the request was refused before it was sent"""
+        response = cls(None, model)
+        response.result = {"error": error, "success": False}
+        return response
+
+    def __iter__(self):
+        if self._chunks is None:
+            return
+        parts = []
+        try:
+            for text in self._chunks(self.usage):
+                if text:
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            label = PROVIDER_LABELS.get(self._provider, "AI")
+            self.result = {"error": f"{label} API error: {str(e)}", "success": False}
+            if self._on_error:
+                self._on_error(e)
+            return
+
+        content = "".join(parts)
+        self.result = {
+            "content": content,
+            "model_used": self.usage.get("model_used", self._model),
+            "tokens_used": self.usage.get("tokens_used") or _count_tokens(content),
+            "success": True
+        }
+        if self._on_complete:
+            self._on_complete(self.result)
 
 class AIManager:
     """Manages communication with multiple AI providers"""
 
     def __init__(self):
+        self._generators = {
+            'openai': self._generate_openai,
+            'anthropic': self._generate_anthropic,
+            'gemini': self._generate_gemini,
+        }
+        # Cache key -> Future for calls in progress, so identical concurrent requests share one call
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
         self.setup_api_clients()
 
     def setup_api_clients(self):
@@ -34,72 +306,177 @@ class AIManager:
         self.openai_available = False
         self.anthropic_available = False
         self.gemini_available = False
-
-        # Debug: Show what secrets are available
-        try:
-            available_secrets = list(st.secrets.keys())
-            st.write(f"🔍 Debug: Top-level secrets: {available_secrets}")
-
-            # Check if we have nested secrets
-            if 'secrets' in st.secrets:
-                nested_secrets = list(st.secrets['secrets'].keys())
-                st.write(f"🔍 Debug: Nested secrets found: {nested_secrets}")
-
-        except Exception as e:
-            st.error(f"Debug: Could not read secrets: {str(e)}")
+        self.semantic_cache = None
+        self._api_keys = {}
+        self._gemini_models = {}
+        self._genai = None
+        self.setup_status: Dict[str, str] = {}
+
+        # Debug: Record which secrets are available (set AI_DEBUG=1 to enable)
+        if os.getenv("AI_DEBUG"):
+            try:
+                self.setup_status['top_level_secrets'] = ", ".join(st.secrets.keys())
+                if 'secrets' in st.secrets:
+                    self.setup_status['nested_secrets'] = ", ".join(st.secrets['secrets'].keys())
+            except Exception as e:
+                self.setup_status['secrets'] = f"Could not read secrets: {str(e)}"
 
         # Try to get API keys from different possible locations
-        openai_key = self._get_secret_key(['OPENAI_API_KEY', 'openai_api_key', 'OPENAI_KEY', 'openai_key'])
-        google_key = self._get_secret_key(['GOOGLE_API_KEY', 'google_api_key', 'GEMINI_API_KEY', 'gemini_api_key'])
-        anthropic_key = self._get_secret_key(['ANTHROPIC_API_KEY', 'anthropic_api_key', 'ANTHROPIC_KEY', 'anthropic_key'])
+        keys = self._collect_api_keys()
+        openai_key = keys.get('openai')
+        google_key = keys.get('gemini')
+        anthropic_key = keys.get('anthropic')
 
         # Setup OpenAI
         try:
-            if openai_key and OPENAI_AVAILABLE:
-                self.openai_client = openai.OpenAI(api_key=openai_key)
+            openai_keys = self._key_list('OPENAI_API_KEYS', openai_key)
+            if openai_keys and OPENAI_AVAILABLE:
+                import openai
+                self._openai_pool = ClientPool([
+                    openai.OpenAI(api_key=key, http_client=_HTTP_CLIENT) for key in openai_keys
+                ])
+                self.openai_client = self._openai_pool.acquire()[1]
+                self._api_keys['openai'] = openai_keys[0]
                 self.openai_available = True
-                st.success("✅ OpenAI API configured successfully")
+                self.setup_status['OpenAI'] = f"✅ configured ({len(openai_keys)} key(s))"
             elif OPENAI_AVAILABLE:
-                st.warning("⚠️ OpenAI library available but API key not found")
+                self.setup_status['OpenAI'] = "⚠️ API key not found"
             else:
-                st.info("ℹ️ OpenAI library not installed")
+                self.setup_status['OpenAI'] = "ℹ️ library not installed"
         except Exception as e:
-            st.error(f"❌ OpenAI setup error: {str(e)}")
+            self.setup_status['OpenAI'] = f"❌ setup error: {str(e)}"
 
         # Setup Google Gemini
         try:
             if google_key and GOOGLE_AVAILABLE:
+                import google.generativeai as genai
+                self._genai = genai
                 genai.configure(api_key=google_key)
+                self._get_gemini_model('gemini-1.5-pro')
+                self._api_keys['gemini'] = google_key
                 self.gemini_available = True
-                st.success("✅ Google Gemini API configured successfully")
+                self.setup_status['Google Gemini'] = "✅ configured"
             elif GOOGLE_AVAILABLE:
-                st.warning("⚠️ Google AI library available but API key not found")
+                self.setup_status['Google Gemini'] = "⚠️ API key not found"
             else:
-                st.info("ℹ️ Google AI library not installed")
+                self.setup_status['Google Gemini'] = "ℹ️ library not installed"
         except Exception as e:
-            st.error(f"❌ Google Gemini setup error: {str(e)}")
+            self.setup_status['Google Gemini'] = f"❌ setup error: {str(e)}"
 
         # Setup Anthropic
         try:
-            if anthropic_key and ANTHROPIC_AVAILABLE:
-                self.anthropic_client = anthropic.Anthropic(api_key=anthropic_key)
+            anthropic_keys = self._key_list('ANTHROPIC_API_KEYS', anthropic_key)
+            if anthropic_keys and ANTHROPIC_AVAILABLE:
+                import anthropic
+                self._anthropic_pool = ClientPool([
+                    anthropic.Anthropic(api_key=key, http_client=_HTTP_CLIENT) for key in anthropic_keys
+                ])
+                self.anthropic_client = self._anthropic_pool.acquire()[1]
+                self._api_keys['anthropic'] = anthropic_keys[0]
                 self.anthropic_available = True
-                st.success("✅ Anthropic API configured successfully")
+                self.setup_status['Anthropic'] = f"✅ configured ({len(anthropic_keys)} key(s))"
             elif ANTHROPIC_AVAILABLE:
-                st.info("ℹ️ Anthropic library available but API key not configured")
+                self.setup_status['Anthropic'] = "ℹ️ API key not configured"
             else:
-                st.info("ℹ️ Anthropic library not installed")
+                self.setup_status['Anthropic'] = "ℹ️ library not installed"
         except Exception as e:
-            st.warning(f"⚠️ Anthropic setup warning: {str(e)}")
+            self.setup_status['Anthropic'] = f"⚠️ setup warning: {str(e)}"
+
+        # Client-side rate limits so concurrent callers queue instead of tripping 429s
+        self._buckets = self._build_rate_limiters()
+
+        # Stop routing to a provider that keeps failing until it has had time to recover
+        self._breakers = {provider: CircuitBreaker(fail_max=5, reset_timeout=30) for provider in PROVIDER_LABELS}
+
+        # Opt-in (KEEP_CONNECTIONS_WARM): open TLS connections in the background so the first
+        # real call skips the handshake. Gemini is left out: its SDK talks gRPC and does not
+        # use the shared httpx pool.
+        self._warm_targets = []
+        self._warm_lock = threading.Lock()
+        self._warming = False
+        self._last_request_at = time.monotonic()
+        if self._get_setting('KEEP_CONNECTIONS_WARM') and _HTTP_CLIENT is not None:
+            if self.openai_available:
+                self._warm_targets.append((
+                    "https://api.openai.com/v1/models",
+                    {"Authorization": f"Bearer {self._api_keys['openai']}"}
+                ))
+            if self.anthropic_available:
+                self._warm_targets.append((
+                    "https://api.anthropic.com/v1/models",
+                    {"x-api-key": self._api_keys['anthropic'], "anthropic-version": "2023-06-01"}
+                ))
+            self._start_warming()
+
+        # Exact-match response cache: in-process LRU backed by Redis (REDIS_URL) or .llm_cache/ on disk
+        self.response_cache = get_llm_cache(self._get_setting('REDIS_URL'))
+        self.setup_status['Response cache'] = self.response_cache.backend
+        if self.response_cache.backend_error:
+            self.setup_status['Response cache'] += f" (shared backend unavailable: {self.response_cache.backend_error})"
+
+        # Semantic caching is opt-in: it reuses responses across reworded prompts, which
+        # needs the embedding model; hits still require identical product-specific values
+        try:
+            if SEMANTIC_CACHE_AVAILABLE and self._get_setting('SEMANTIC_CACHE'):
+                self.semantic_cache = get_semantic_cache()
+        except Exception:
+            self.semantic_cache = None
 
-        # Final status
+        # Availability only changes when setup runs again, so the model list and status are built here
+        self._provider_status = {
+            "openai": self.openai_available,
+            "anthropic": self.anthropic_available,
+            "gemini": self.gemini_available
+        }
+        self._available_models = []
+        if self.openai_available:
+            self._available_models.extend(["gpt-4", "gpt-3.5-turbo"])
+        if self.anthropic_available:
+            self._available_models.extend(["claude-3-5-sonnet-20240620"])
+        if self.gemini_available:
+            self._available_models.extend(["gemini-1.5-pro"])
+
+    def _start_warming(self):
+        """Start the warm-up chain unless it is already running or disabled"""
+        with self._warm_lock:
+            if self._warming or not self._warm_targets:
+                return
+            self._warming = True
+        threading.Thread(target=self._keep_connections_warm, daemon=True).start()
+
+    def _keep_connections_warm(self):
+        """Touch each provider host through the shared pool, re-arming only while requests are recent"""
+        for url, headers in self._warm_targets:
+            try:
+                _HTTP_CLIENT.head(url, headers=headers, timeout=5.0)
+            except Exception:
+                pass
+
+        with self._warm_lock:
+            if time.monotonic() - self._last_request_at > KEEPALIVE_IDLE_WINDOW_SECONDS:
+                # Idle session: let the chain end; the next real request restarts it
+                self._warming = False
+                return
+        timer = threading.Timer(KEEPALIVE_INTERVAL_SECONDS, self._keep_connections_warm)
+        timer.daemon = True
+        timer.start()
+
+    def _note_request(self):
+        """Record a real provider request and resume warm-up if it had stopped"""
+        self._last_request_at = time.monotonic()
+        self._start_warming()
+
+    def render_status(self):
+        """Render provider setup results in a single collapsible status container"""
         total_available = sum([self.openai_available, self.anthropic_available, self.gemini_available])
+
         if total_available > 0:
-            st.success(f"🎯 {total_available} AI provider(s) configured successfully!")
-        else:
-            st.error("❌ No AI providers available. Please check your API keys in Streamlit secrets.")
+            with st.status(f"🎯 {total_available} AI provider(s) configured", state="complete"):
+                st.json(self.setup_status)
+            return
 
-            # Show helpful error message
+        with st.status("❌ No AI providers available", state="error", expanded=True):
+            st.json(self.setup_status)
             st.markdown("""
             ### 🔧 How to Fix This:
 
@@ -119,39 +496,77 @@ class AIManager:
             - No extra formatting or brackets
             """)
 
-    def _get_secret_key(self, possible_keys: list) -> Optional[str]:
-        """Try to get API key from different possible locations"""
-
-        # First try top-level secrets
-        for key_name in possible_keys:
-            try:
-                if key_name in st.secrets:
-                    key_value = st.secrets[key_name]
-                    if key_value:  # Make sure it's not empty
-                        st.write(f"✅ Found {key_name} at top level")
-                        return str(key_value)
-            except:
-                continue
-
-        # Then try nested secrets
+    def _get_setting(self, name: str) -> Any:
+        """Read an optional setting from top-level or nested [secrets]"""
         try:
+            if name in st.secrets:
+                return st.secrets[name]
             if 'secrets' in st.secrets:
-                nested = st.secrets['secrets']
-                for key_name in possible_keys:
-                    if key_name in nested:
-                        key_value = nested[key_name]
-                        if key_value:  # Make sure it's not empty
-                            st.write(f"✅ Found {key_name} in nested secrets")
-                            return str(key_value)
-        except:
+                return st.secrets['secrets'].get(name)
+        except Exception:
             pass
-
-        # Not found anywhere
-        st.warning(f"⚠️ Could not find any of these keys: {possible_keys}")
         return None
 
-    def generate_content(self, prompt: str, model: str, temperature: float = 0.7, max_tokens: int = 4000) -> Dict[str, Any]:
-        """Generate content using specified AI model"""
+    def _build_rate_limiters(self) -> Dict[str, TokenBucket]:
+        """One token bucket per provider, with quotas overridable by e.g. OPENAI_RPM / OPENAI_TPM"""
+        buckets = {}
+        for provider, (rpm, tpm) in DEFAULT_RATE_LIMITS.items():
+            prefix = provider.upper()
+            buckets[provider] = TokenBucket(
+                rpm=self._limit_setting(f'{prefix}_RPM', rpm),
+                tpm=self._limit_setting(f'{prefix}_TPM', tpm)
+            )
+        return buckets
+
+    def _limit_setting(self, name: str, default: int) -> int:
+        """Read a per-minute quota, clamped to at least 1; unparseable values use the default"""
+        value = self._get_setting(name)
+        if value is None or value == '':
+            return default
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return default
+
+    def _key_list(self, setting: str, fallback: Optional[str]) -> List[str]:
+        """Keys from a list (or comma-separated) secret such as OPENAI_API_KEYS, else the single key"""
+        keys = self._get_setting(setting)
+        if isinstance(keys, str):
+            keys = keys.split(',')
+        keys = [str(key).strip() for key in (keys or []) if str(key).strip()]
+        return keys or ([fallback] if fallback else [])
+
+    def _collect_api_keys(self) -> Dict[str, str]:
+        """Map each provider to its API key in one pass over top-level then nested secrets"""
+        found: Dict[str, str] = {}
+        try:
+            sections = [st.secrets]
+            if 'secrets' in st.secrets:
+                sections.append(st.secrets['secrets'])
+        except Exception:
+            # No secrets.toml at all
+            return found
+
+        for section in sections:
+            for key_name, key_value in section.items():
+                provider = _ALIAS_MAP.get(key_name.lower())
+                if provider and key_value and provider not in found:
+                    found[provider] = str(key_value)
+        return found
+
+    def generate_content(self, prompt: str, model: str, temperature: float = 0.7, max_tokens: int = 4000,
+                         use_cache: Optional[bool] = None, auto_route: bool = True,
+                         system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Generate content using specified AI model, serving repeats from the response cache
+
+        The cache is shared across sessions, so by default only deterministic
+        (temperature 0) calls use it. Pass use_cache=True to opt in at higher
+        temperatures, or use_cache=False to regenerate: the lookup is skipped
+        and the fresh result replaces the cached one.
+
+        system_prompt carries context shared across steps; it is sent as a
+        separate, provider-cacheable prefix ahead of the step-specific prompt.
+        """
 
         # Check if any providers are available
         if not (self.openai_available or self.anthropic_available or self.gemini_available):
@@ -160,123 +575,400 @@ class AIManager:
                 "success": False
             }
 
-        # Try to generate content
-        for attempt in range(3):
-            try:
-                if model.startswith('gpt') and self.openai_available:
-                    return self._generate_openai(prompt, model, temperature, max_tokens)
-                elif model.startswith('claude') and self.anthropic_available:
-                    return self._generate_anthropic(prompt, model, temperature, max_tokens)
-                elif model.startswith('gemini') and self.gemini_available:
-                    return self._generate_gemini(prompt, temperature, max_tokens)
-                else:
-                    # Fallback to any available provider
-                    if self.openai_available:
-                        return self._generate_openai(prompt, "gpt-4", temperature, max_tokens)
-                    elif self.gemini_available:
-                        return self._generate_gemini(prompt, temperature, max_tokens)
-                    elif self.anthropic_available:
-                        return self._generate_anthropic(prompt, "claude-3-5-sonnet-20240620", temperature, max_tokens)
-                    else:
-                        return {"error": "No available providers", "success": False}
-
-            except Exception as e:
-                if attempt == 2:  # Last attempt
-                    return {"error": f"Failed after 3 attempts: {str(e)}", "success": False}
-                else:
-                    time.sleep(random.uniform(1, 3))
-                    continue
+        requested_model = model
+        if auto_route:
+            model = self._route_to_cheaper_model(prompt, model, max_tokens)
+
+        error = self._context_window_error(prompt, model, max_tokens, system_prompt)
+        if error:
+            return {"error": error, "success": False}
+
+        result = self._generate_cached(prompt, model, temperature, max_tokens, use_cache, system_prompt)
+        if model != requested_model and result.get('success', False):
+            result = dict(result, downgraded_from=requested_model)
+        return result
+
+    @staticmethod
+    def _context_window_error(prompt: str, model: str, max_tokens: int, system_prompt: Optional[str]) -> Optional[str]:
+        """Reject requests that can't fit the context window before paying for a round trip"""
+        context_window = MODEL_CONTEXT_WINDOWS.get(model)
+        if not context_window:
+            return None
+        input_tokens = _count_tokens(prompt, model) + (_count_tokens(system_prompt, model) if system_prompt else 0)
+        if input_tokens + max_tokens > context_window:
+            return (f"Request needs ~{input_tokens + max_tokens} tokens but {model} allows {context_window}. "
+                    f"Shorten the inputs or lower max_tokens.")
+        return None
 
-        return {"error": "Unexpected error", "success": False}
+    @staticmethod
+    def _route_to_cheaper_model(prompt: str, model: str, max_tokens: int) -> str:
+        """Send short prompts with short outputs (CTAs, headlines) to the cheaper sibling model"""
+        cheaper = CHEAP_MODEL_ROUTES.get(model)
+        if cheaper and max_tokens < CHEAP_ROUTE_MAX_OUTPUT and _count_tokens(prompt) < CHEAP_ROUTE_MAX_PROMPT:
+            return cheaper
+        return model
+
+    def _generate_cached(self, prompt: str, model: str, temperature: float, max_tokens: int,
+                         use_cache: Optional[bool], system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Serve from the exact or semantic cache, otherwise call the provider and cache the result"""
+        cache_key = self.response_cache.key(prompt, model, temperature, max_tokens, system_prompt)
+        read_cache, write_cache = _cache_policy(use_cache, temperature)
+        prompt_vector = None
+        if read_cache:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            if self.semantic_cache:
+                try:
+                    prompt_vector = self.semantic_cache.embed(prompt)
+                    cached = self.semantic_cache.lookup(prompt_vector, prompt, model, temperature, max_tokens,
+                                                        system_prompt)
+                    if cached is not None:
+                        return cached
+                except Exception:
+                    prompt_vector = None
+
+            # Single-flight: a duplicate of a request already in progress waits for its result
+            with self._inflight_lock:
+                pending = self._inflight.get(cache_key)
+                if pending is None:
+                    future = self._inflight[cache_key] = Future()
+            if pending is not None:
+                return dict(pending.result())
+        else:
+            future = None
 
-    def _generate_openai(self, prompt: str, model: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
-        """Generate content using OpenAI"""
         try:
-            response = self.openai_client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens
+            result = self._generate_uncached(prompt, model, temperature, max_tokens, system_prompt)
+
+            if write_cache and result.get('success', False):
+                self.response_cache.set(cache_key, result)
+                if prompt_vector is not None:
+                    self.semantic_cache.add(prompt_vector, prompt, result, model, temperature, max_tokens,
+                                            system_prompt)
+            if future is not None:
+                future.set_result(result)
+        except BaseException as e:
+            if future is not None:
+                future.set_exception(e)
+            raise
+        finally:
+            if future is not None:
+                with self._inflight_lock:
+                    self._inflight.pop(cache_key, None)
+
+        return result
+
+    def generate_content_stream(self, prompt: str, model: str, temperature: float = 0.7, max_tokens: int = 4000,
+                                use_cache: Optional[bool] = None, auto_route: bool = True, system_prompt: Optional[str] = None,
+                                json_mode: bool = False) -> StreamingResponse:
+        """Stream content as it is generated; iterate (e.g. with st.write_stream) then read .result
+
+        Applies the same cheap-model routing, context pre-flight, cache policy and circuit
+        breakers as generate_content; retries are not possible once text has been streamed.
+        json_mode asks the provider for a single JSON object (OpenAI response_format,
+        Gemini response_mime_type); Anthropic has no such switch and relies on the prompt.
+        """
+        if auto_route:
+            model = self._route_to_cheaper_model(prompt, model, max_tokens)
+
+        # Cache hits are answered before a provider is picked, so they never take a breaker trial
+        cache_key = self.response_cache.key(prompt, model, temperature, max_tokens, system_prompt, json_mode)
+        read_cache, write_cache = _cache_policy(use_cache, temperature)
+        if read_cache:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                def replay(usage):
+                    usage.update(model_used=cached['model_used'], tokens_used=cached['tokens_used'])
+                    yield cached['content']
+                return StreamingResponse(replay, model)
+
+        provider, target_model = self._resolve_provider(model)
+
+        if provider is None:
+            return StreamingResponse.failed(
+                "No AI providers available. Please configure API keys in Streamlit Cloud secrets.", model
             )
 
-            content = response.choices[0].message.content
+        error = self._context_window_error(prompt, target_model, max_tokens, system_prompt)
+        if error:
+            self._breakers[provider].release_trial()
+            return StreamingResponse.failed(error, target_model)
+
+        if provider == 'openai':
+            chunks = lambda usage: self._stream_openai(prompt, target_model, temperature, max_tokens, usage,
+                                                       system_prompt, json_mode)
+        elif provider == 'anthropic':
+            chunks = lambda usage: self._stream_anthropic(prompt, target_model, temperature, max_tokens, usage,
+                                                          system_prompt)
+        else:
+            chunks = lambda usage: self._stream_gemini(prompt, target_model, temperature, max_tokens, usage,
+                                                       system_prompt, json_mode)
 
-            return {
-                "content": content,
-                "model_used": model,
-                "tokens_used": response.usage.total_tokens,
-                "success": True
-            }
+        breaker = self._breakers[provider]
 
-        except Exception as e:
-            return {"error": f"OpenAI API error: {str(e)}", "success": False}
+        def on_complete(result):
+            breaker.record_success()
+            if write_cache:
+                self.response_cache.set(cache_key, result)
+
+        def on_error(error):
+            if _is_retryable(error):
+                breaker.record_failure()
+            else:
+                breaker.release_trial()
+
+        return StreamingResponse(chunks, target_model, provider, on_complete, on_error)
+
+    def _stream_openai(self, prompt: str, model: str, temperature: float, max_tokens: int, usage: Dict[str, Any],
+                       system_prompt: Optional[str] = None, json_mode: bool = False):
+        """Yield OpenAI completion text deltas as they arrive"""
+        self._throttle('openai', prompt, max_tokens, system_prompt)
+        extra = {}
+        if json_mode and model not in JSON_MODE_UNSUPPORTED:
+            extra["response_format"] = {"type": "json_object"}
+        stream = self._openai_pool.acquire()[1].chat.completions.create(
+            model=model,
+            messages=_openai_messages(prompt, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **extra
+        )
+        for chunk in stream:
+            if chunk.usage:
+                usage["tokens_used"] = chunk.usage.total_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _stream_anthropic(self, prompt: str, model: str, temperature: float, max_tokens: int, usage: Dict[str, Any],
+                          system_prompt: Optional[str] = None):
+        """Yield Anthropic completion text as it arrives"""
+        self._throttle('anthropic', prompt, max_tokens, system_prompt)
+        with self._anthropic_pool.acquire()[1].messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            **_anthropic_system(system_prompt)
+        ) as stream:
+            yield from stream.text_stream
+            final = stream.get_final_message()
+            usage["tokens_used"] = final.usage.input_tokens + final.usage.output_tokens
+
+    def _provider_ready(self, provider: str) -> bool:
+        """True if the provider is configured and its circuit breaker lets this call through
+
+        When the breaker is half-open this takes its single trial, so the caller must
+        make the request (or call release_trial) once this returns True.
+        """
+        return getattr(self, f'{provider}_available') and self._breakers[provider].allows_requests()
+
+    def _stream_gemini(self, prompt: str, model_name: str, temperature: float, max_tokens: int,
+                       usage: Dict[str, Any], system_prompt: Optional[str] = None, json_mode: bool = False):
+        """Yield Gemini completion text as it arrives"""
+        self._throttle('gemini', prompt, max_tokens, system_prompt)
+        extra = {"response_mime_type": "application/json"} if json_mode else {}
+        response = self._get_gemini_model(model_name).generate_content(
+            _gemini_prompt(prompt, system_prompt),
+            generation_config=self._genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                **extra
+            ),
+            stream=True
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+            metadata = getattr(chunk, 'usage_metadata', None)
+            if metadata and getattr(metadata, 'total_token_count', 0):
+                usage["tokens_used"] = metadata.total_token_count
+
+    def _resolve_provider(self, model: str) -> Tuple[Optional[str], str]:
+        """Pick the provider for a model, falling back to any available provider"""
+        for prefix, provider, _ in MODEL_ROUTES:
+            if model.startswith(prefix):
+                if self._provider_ready(provider):
+                    return provider, model
+                break
+
+        # Fallback to any available provider
+        for _, provider, fallback_model in MODEL_ROUTES:
+            if self._provider_ready(provider):
+                return provider, fallback_model
+        return None, model
+
+    def _generate_uncached(self, prompt: str, model: str, temperature: float, max_tokens: int,
+                           system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Call the matching provider; transient errors are retried by _provider_retry"""
+        provider, target_model = self._resolve_provider(model)
+        if provider is None:
+            return {"error": "No available providers", "success": False}
 
-    def _generate_gemini(self, prompt: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
-        """Generate content using Gemini"""
         try:
-            model = genai.GenerativeModel('gemini-1.5-pro')
+            result = self._generators[provider](prompt, target_model, temperature, max_tokens, system_prompt)
+        except Exception as e:
+            # Bad requests and auth errors say nothing about provider health, so they don't trip the breaker
+            if _is_retryable(e):
+                self._breakers[provider].record_failure()
+            else:
+                self._breakers[provider].release_trial()
+            return {"error": f"{PROVIDER_LABELS[provider]} API error: {str(e)}", "success": False}
 
-            generation_config = genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens
-            )
+        self._breakers[provider].record_success()
+        return result
 
-            response = model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
+    def _throttle(self, provider: str, prompt: str, max_tokens: int, system_prompt: Optional[str] = None):
+        """Wait for rate-limit capacity for one request to a provider, counting the system prompt too"""
+        self._note_request()
+        input_tokens = _count_tokens(prompt) + (_count_tokens(system_prompt) if system_prompt else 0)
+        self._buckets[provider].acquire(tokens=input_tokens + max_tokens)
 
-            return {
-                "content": response.text,
-                "model_used": "gemini-1.5-pro",
-                "tokens_used": len(response.text) // 4,
-                "success": True
-            }
+    @_provider_retry
+    def _generate_openai(self, prompt: str, model: str, temperature: float, max_tokens: int,
+                         system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Generate content using OpenAI"""
+        self._throttle('openai', prompt, max_tokens, system_prompt)
+        index, client = self._openai_pool.acquire()
+        raw = client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=_openai_messages(prompt, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        self._openai_pool.report(index, raw.headers)
+        response = raw.parse()
+
+        content = response.choices[0].message.content
 
-        except Exception as e:
-            return {"error": f"Gemini API error: {str(e)}", "success": False}
+        return {
+            "content": content,
+            "model_used": model,
+            "tokens_used": response.usage.total_tokens,
+            "success": True
+        }
+
+    def _get_gemini_model(self, model_name: str):
+        """Return the GenerativeModel for a name, constructing it only once"""
+        if model_name not in self._gemini_models:
+            self._gemini_models[model_name] = self._genai.GenerativeModel(model_name)
+        return self._gemini_models[model_name]
+
+    @_provider_retry
+    def _generate_gemini(self, prompt: str, model_name: str, temperature: float, max_tokens: int,
+                         system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Generate content using Gemini"""
+        self._throttle('gemini', prompt, max_tokens, system_prompt)
+        model = self._get_gemini_model(model_name)
 
-    def _generate_anthropic(self, prompt: str, model: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+        generation_config = self._genai.types.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens
+        )
+
+        response = model.generate_content(
+            _gemini_prompt(prompt, system_prompt),
+            generation_config=generation_config
+        )
+
+        return {
+            "content": response.text,
+            "model_used": model_name,
+            "tokens_used": _gemini_tokens(prompt, response),
+            "success": True
+        }
+
+    @_provider_retry
+    def _generate_anthropic(self, prompt: str, model: str, temperature: float, max_tokens: int,
+                            system_prompt: Optional[str] = None) -> Dict[str, Any]:
         """Generate content using Anthropic"""
-        try:
-            response = self.anthropic_client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[{"role": "user", "content": prompt}]
-            )
+        self._throttle('anthropic', prompt, max_tokens, system_prompt)
+        index, client = self._anthropic_pool.acquire()
+        raw = client.messages.with_raw_response.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            **_anthropic_system(system_prompt)
+        )
+        self._anthropic_pool.report(index, raw.headers)
+        response = raw.parse()
+
+        content = response.content[0].text
 
-            content = response.content[0].text
+        return {
+            "content": content,
+            "model_used": model,
+            "tokens_used": response.usage.input_tokens + response.usage.output_tokens,
+            "success": True
+        }
 
-            return {
-                "content": content,
-                "model_used": model,
-                "tokens_used": response.usage.input_tokens + response.usage.output_tokens,
-                "success": False
-            }
+    @staticmethod
+    def max_output_tokens(model: str, requested: int) -> int:
+        """Clamp a requested max_tokens to the model's per-request output limit"""
+        return min(requested, MODEL_MAX_OUTPUT_TOKENS.get(model, requested))
 
-        except Exception as e:
-            return {"error": f"Anthropic API error: {str(e)}", "success": False}
+    @staticmethod
+    def validate_json_response(content: str, expected_type: Optional[type] = None) -> Dict[str, Any]:
+        """Extract the JSON object/array from an AI response, tolerating surrounding prose
 
-    def get_available_models(self) -> list:
-        """Return available models"""
-        models = []
+        When the prose holds several bracketed spans (a "[1]" citation before the
+        payload, say), the first one of expected_type wins; objects are preferred
+        when no type is given. Other spans are used only if none matches.
+        """
+        if not content:
+            return {'valid': False, 'error': 'Response is empty'}
 
-        if self.openai_available:
-            models.extend(["gpt-4", "gpt-3.5-turbo"])
+        try:
+            return {'valid': True, 'data': serialization.loads(content)}
+        except ValueError:
+            pass
 
-        if self.anthropic_available:
-            models.extend(["claude-3-5-sonnet-20240620"])
+        fenced = _JSON_FENCE.search(content)
+        if fenced:
+            try:
+                return {'valid': True, 'data': serialization.loads(fenced.group(1))}
+            except ValueError:
+                pass
+
+        preferred = expected_type or dict
+        spans = _json_spans(content)
+        for span in spans:
+            if isinstance(span, preferred):
+                return {'valid': True, 'data': span}
+
+        # Before settling for another span, parse the outermost span of the preferred type leniently
+        start = content.find('[' if preferred is list else '{')
+        if start < 0:
+            first_bracket = _JSON_START.search(content)
+            start = first_bracket.start() if first_bracket else -1
+        end = max(content.rfind('}'), content.rfind(']'))
+        if start >= 0 and end > start:
+            candidate = fenced.group(1) if fenced else content[start:end + 1]
+            try:
+                if JSON5_AVAILABLE:
+                    return {'valid': True, 'data': json5.loads(candidate)}
+                return {'valid': True, 'data': serialization.loads(_TRAILING_COMMA.sub(r'\1', candidate))}
+            except ValueError:
+                pass
 
-        if self.gemini_available:
-            models.extend(["gemini-1.5-pro"])
+        if spans:
+            return {'valid': True, 'data': spans[0]}
+
+        return {'valid': False, 'error': 'No valid JSON found in response'}
 
-        return models
+    def get_available_models(self) -> list:
+        """Return available models, as recorded by setup_api_clients"""
+        return list(self._available_models)
 
     def get_provider_status(self) -> Dict[str, bool]:
-        """Get provider status"""
-        return {
-            "openai": self.openai_available,
-            "anthropic": self.anthropic_available, 
-            "gemini": self.gemini_available
-        }
+        """Get provider status, as recorded by setup_api_clients"""
+        return dict(self._provider_status)
+
+@st.cache_resource(show_spinner=False)
+def get_ai_manager() -> AIManager:
+    """Return the process-wide AIManager so clients are not rebuilt on every rerun"""
+    return AIManager()
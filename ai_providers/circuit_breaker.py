@@ -0,0 +1,72 @@
+import threading
+import time
+
+class CircuitBreaker:
+    """Stops routing to a provider after repeated failures until a cooldown has passed
+
+    closed    -> calls flow normally, consecutive failures are counted
+    open      -> calls are refused for reset_timeout seconds
+    half_open -> cooldown over; exactly one caller is let through as a trial and the
+                 rest are refused until it closes or re-opens the circuit
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started = None
+        self._trial_owner = None
+        self._lock = threading.Lock()
+
+    @property
+    def current_state(self) -> str:
+        """Return 'closed', 'open' or 'half_open'"""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def allows_requests(self) -> bool:
+        """True while closed; once the cooldown is over, True only for the caller that takes the trial
+
+        A trial whose outcome is never recorded is given up after another
+        reset_timeout, so a lost caller cannot hold the circuit half-open forever.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            self._trial_owner = threading.get_ident()
+            return True
+
+    def release_trial(self):
+        """Give back a trial taken by this thread without an outcome, e.g. when no call was made"""
+        with self._lock:
+            if self._trial_owner == threading.get_ident():
+                self._trial_started = None
+                self._trial_owner = None
+
+    def record_success(self):
+        """Close the circuit and reset the failure count"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+            self._trial_owner = None
+
+    def record_failure(self):
+        """Count a failure, opening (or re-opening after a failed trial) the circuit at fail_max"""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+            self._trial_started = None
+            self._trial_owner = None
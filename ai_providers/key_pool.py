@@ -0,0 +1,51 @@
+import threading
+from typing import Any, List, Optional, Tuple
+
+# Remaining-request headers reported by each provider
+_REMAINING_HEADERS = ("x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining")
+
+class ClientPool:
+    """Spreads requests round-robin over clients for several API keys
+
+    Keys whose last response reported fewer than low_watermark remaining
+    requests are skipped while any other key still has headroom.
+    """
+
+    def __init__(self, clients: List[Any], low_watermark: int = 5):
+        self._clients = list(clients)
+        self._remaining: List[Optional[int]] = [None] * len(self._clients)
+        self._next = 0
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def acquire(self) -> Tuple[int, Any]:
+        """Return (index, client) for the next key with quota left, else the one with the most"""
+        with self._lock:
+            count = len(self._clients)
+            order = [(self._next + offset) % count for offset in range(count)]
+            index = next((i for i in order if self._quota(i) > self.low_watermark), None)
+            if index is None:
+                index = max(order, key=self._quota)
+            self._next = (index + 1) % count
+            return index, self._clients[index]
+
+    def _quota(self, index: int) -> float:
+        """Remaining requests last reported for a key; unknown counts as unlimited"""
+        remaining = self._remaining[index]
+        return float('inf') if remaining is None else remaining
+
+    def report(self, index: int, headers):
+        """Record the remaining quota a response reported for a key"""
+        for name in _REMAINING_HEADERS:
+            value = headers.get(name)
+            if value is not None:
+                try:
+                    remaining = int(value)
+                except ValueError:
+                    return
+                with self._lock:
+                    self._remaining[index] = remaining
+                return
@@ -0,0 +1,43 @@
+import threading
+import time
+from typing import Optional
+
+class TokenBucket:
+    """Per-provider requests-per-minute and tokens-per-minute limiter
+
+    Callers reserve capacity up front and then wait out any deficit, so the
+    same bucket can be shared by threads without holding a lock while sleeping.
+    """
+
+    def __init__(self, rpm: int, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens; return seconds to wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+            self._requests -= 1
+            wait = -self._requests * 60 / self.rpm
+
+            if self.tpm:
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                self._tokens -= min(tokens, self.tpm)
+                wait = max(wait, -self._tokens * 60 / self.tpm)
+
+            return max(wait, 0.0)
+
+    def acquire(self, tokens: int = 0):
+        """Block the calling thread until the request fits within the quota"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
@@ -1,5 +1,4 @@
 import streamlit as st
-import json
 import time
 from datetime import datetime
 import base64
@@ -25,10 +24,11 @@ try:
     from modules.step_6_final_cta import FinalCTAModule
     from modules.step_7_assembly import AssemblyModule
     from modules.step_8_design import DesignModule
-    from ai_providers.ai_manager import AIManager
+    from ai_providers.ai_manager import get_ai_manager
     from outputs.output_generator import OutputGenerator
-    from utils.state_management import StateManager
+    from utils.state_management import get_state_manager, migrate_completion_flags
     from utils.validation import ValidationHelper
+    from utils import serialization
 except ImportError as e:
     st.error(f"Import Error: {str(e)}")
     st.error("Please ensure all module files are present and correctly formatted.")
@@ -111,7 +111,7 @@ def main():
     load_custom_css()
 
     # Initialize state management
-    state_manager = StateManager()
+    state_manager = get_state_manager()
     state_manager.initialize_session_state()
 
     # Header
@@ -131,6 +131,9 @@ def main():
         if project_name:
             st.session_state.workflow_data['project_name'] = project_name
 
+        # AI Provider Status
+        get_ai_manager().render_status()
+
         # AI Model Selection
         st.markdown("### 🤖 AI Model Selection")
         ai_models = {
@@ -152,10 +155,8 @@ def main():
 
         # Progress Tracking
         st.markdown("### 📊 Progress Tracking")
-        steps_completed = sum([
-            st.session_state.workflow_data.get(f'step_{i}_completed', False) 
-            for i in range(1, 9)
-        ])
+        completion_mask = st.session_state.workflow_data['completion_mask']
+        steps_completed = bin(completion_mask).count('1')
         progress_percentage = (steps_completed / 8) * 100
 
         # Custom progress bar
@@ -183,7 +184,7 @@ def main():
 
         # Create navigation buttons
         for i, step_name in enumerate(step_names, 1):
-            is_completed = st.session_state.workflow_data.get(f'step_{i}_completed', False)
+            is_completed = bool(completion_mask & (1 << (i - 1)))
             is_current = st.session_state.workflow_data.get('current_step', 1) == i
 
             if is_completed:
@@ -219,21 +220,21 @@ def main():
     # Main Content Area
     current_step = st.session_state.workflow_data.get('current_step', 1)
 
-    # Step modules mapping
+    # Step modules mapping - only the current step is instantiated each rerun
     step_modules = {
-        1: ProductResearchModule(),
-        2: OutlineModule(),
-        3: HeroModule(),
-        4: PASModule(),
-        5: SocialProofModule(),
-        6: FinalCTAModule(),
-        7: AssemblyModule(),
-        8: DesignModule()
+        1: ProductResearchModule,
+        2: OutlineModule,
+        3: HeroModule,
+        4: PASModule,
+        5: SocialProofModule,
+        6: FinalCTAModule,
+        7: AssemblyModule,
+        8: DesignModule
     }
 
     # Display current step
     if current_step in step_modules:
-        step_modules[current_step].render()
+        step_modules[current_step]().render()
 
     # Navigation buttons at bottom
     render_navigation_buttons(current_step)
@@ -244,14 +245,12 @@ def main():
 
 def save_project():
     """Save current project state to JSON"""
-    project_data = st.session_state.workflow_data.copy()
-    project_data['saved_at'] = datetime.now().isoformat()
-
-    json_data = json.dumps(project_data, indent=2, default=str)
+    workflow_data = st.session_state.workflow_data
+    json_data = serialization.dumps({**workflow_data, 'saved_at': datetime.now().isoformat()}, indent=True)
     st.download_button(
         label="📥 Download Project File",
         data=json_data,
-        file_name=f"{project_data.get('project_name', 'landing_page_project')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        file_name=f"{workflow_data.get('project_name', 'landing_page_project')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
         mime="application/json"
     )
 
@@ -265,7 +264,8 @@ def load_project():
 
     if uploaded_file is not None:
         try:
-            project_data = json.loads(uploaded_file.getvalue())
+            project_data = serialization.loads(uploaded_file.getvalue())
+            migrate_completion_flags(project_data)
             st.session_state.workflow_data.update(project_data)
             st.success("✅ Project loaded successfully!")
             time.sleep(1)
@@ -337,7 +337,7 @@ def render_navigation_buttons(current_step):
     with col3:
         if current_step < 8:
             # Check if current step is completed before allowing next
-            current_step_completed = st.session_state.workflow_data.get(f'step_{current_step}_completed', False)
+            current_step_completed = bool(st.session_state.workflow_data['completion_mask'] & (1 << (current_step - 1)))
             if current_step_completed:
                 if st.button("Next Step ➡️", use_container_width=True):
                     st.session_state.workflow_data['current_step'] = current_step + 1
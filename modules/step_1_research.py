@@ -1,24 +1,346 @@
 import streamlit as st
-import json
-import time
+import functools
+import string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
     from utils.validation import ValidationHelper
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+# Research calls run here so the script thread can keep rerunning while the provider responds
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="step1-research")
+RESEARCH_JOB_KEY = 'step1_research_job'
+REGENERATE_KEY = 'step1_regenerate'  # Set by "Redo Research" so the next run skips the response cache
+RESEARCH_POLL_SECONDS = 0.5  # Refresh interval of the progress fragment while research runs
+
+# Research instructions never vary, so they go first as a provider-cacheable system prompt
+# and only the product details are sent per request. The field guide keeps it above the
+# providers' 1024-token caching minimum (see PROMPT_CACHE_MIN_TOKENS).
+RESEARCH_SYSTEM_PROMPT = """# Product Research & Market Intelligence
+
+You research products for PPC affiliate landing pages. For the product and audience given,
+conduct comprehensive research and provide insights on:
+
+1. **Product Analysis**
+   - Key features and benefits
+   - Unique selling propositions
+   - Product positioning
+
+2. **Market Analysis** 
+   - Market size and trends
+   - Competitive landscape
+   - Pricing analysis
+
+3. **Audience Intelligence**
+   - Demographics and psychographics
+   - Pain points and motivations
+   - Buying triggers
+
+4. **Messaging Insights**
+   - Key value propositions
+   - Emotional triggers
+   - Objection handling points
+
+5. **Conversion Optimization**
+   - Trust building elements
+   - Social proof opportunities
+   - Urgency and scarcity factors
+
+## Field Guide
+
+Product analysis:
+- key_features: concrete, verifiable features of this exact product (materials, specs,
+  ingredients, modules, integrations), most important first. Three to six items.
+- unique_selling_propositions: what this product offers that its direct competitors do not,
+  each phrased as a benefit the buyer can check. Two to four items.
+- product_positioning: one sentence naming who the product is for, the problem it solves
+  and how it differs from the obvious alternative.
+
+Market analysis:
+- market_size: the size or growth of the product's market as the sources describe it, with
+  the year or source if known. Leave empty rather than estimate.
+- trends: current shifts in demand or buyer behaviour that make the product relevant now.
+- pricing: where the product's price sits against comparable products, including typical
+  discounts, bundles, subscriptions or guarantees.
+- competitive_landscape.main_competitors: named products or brands a buyer would compare
+  this product with.
+- competitive_landscape.competitive_advantages: specific points on which this product
+  beats those competitors.
+
+Audience intelligence:
+- demographics: short descriptions of the likely buyers' age_range, gender, income and
+  education, drawn from the target audience given and the product category.
+- pain_points: problems the audience has before buying, in their own words, most pressing
+  first. Four to six items.
+- motivations: the outcomes the audience wants, including emotional ones.
+- buying_triggers: moments or events that make the audience ready to buy now.
+
+Messaging insights:
+- value_propositions: headline-ready statements of the main benefit, each under fifteen
+  words and specific to the product.
+- emotional_triggers: feelings the page should speak to, each tied to a pain point or
+  motivation above.
+- objections_to_address: doubts that stop the audience from buying (price, trust, effort,
+  fit, risk), phrased as the buyer would think them.
+
+Conversion optimization:
+- trust_elements: guarantees, certifications, return policies, reviews or credentials the
+  product actually has.
+- social_proof_opportunities: kinds of proof the page owner could collect or show, such as
+  review counts, user stories or expert mentions, without inventing any.
+- urgency_factors: real reasons to act now from the offer itself, never invented scarcity.
+
+## Research Depth
+- Basic: the most important items per list and a short positioning sentence.
+- Standard: the item counts in the field guide.
+- Comprehensive: the upper end of each item count, with more specific detail per item.
+
+## Sources
+- Prefer the product's own sales page (the target URL when one is given), the merchant's
+  documentation and independent reviews over general knowledge of the category.
+- When sources disagree, use the more conservative statement and keep the claim narrow.
+- Never present an assumption about the audience as a measured fact; describe it as the
+  likely buyer rather than quoting a percentage.
+
+## Quality Rules
+- Everything must be specific to the product and audience given. If a field would only be
+  true of the product category in general, leave it empty.
+- Do not invent statistics, studies, reviews, certifications or competitor claims.
+- Keep each list item to one short sentence or phrase with no trailing period.
+- Write in plain English suitable for reuse in landing page copy.
+
+Return a single JSON object with exactly this structure and these key names. Every list
+holds short strings. Use an empty string or an empty list for anything you cannot determine
+for this product; never fill a field with generic or invented claims.
+
+{
+  "product_analysis": {
+    "key_features": ["..."],
+    "unique_selling_propositions": ["..."],
+    "product_positioning": "..."
+  },
+  "market_analysis": {
+    "market_size": "...",
+    "trends": ["..."],
+    "pricing": "...",
+    "competitive_landscape": {
+      "main_competitors": ["..."],
+      "competitive_advantages": ["..."]
+    }
+  },
+  "audience_intelligence": {
+    "demographics": {
+      "age_range": "...",
+      "gender": "...",
+      "income": "...",
+      "education": "..."
+    },
+    "pain_points": ["..."],
+    "motivations": ["..."],
+    "buying_triggers": ["..."]
+  },
+  "messaging_insights": {
+    "value_propositions": ["..."],
+    "emotional_triggers": ["..."],
+    "objections_to_address": ["..."]
+  },
+  "conversion_optimization": {
+    "trust_elements": ["..."],
+    "social_proof_opportunities": ["..."],
+    "urgency_factors": ["..."]
+  }
+}
+
+Keep the insights actionable for landing page creation."""
+
+# Per-request part of the research prompt; compiled once, filled with plain $name substitution
+_RESEARCH_PROMPT_TEMPLATE = string.Template("""## Product Details
+- Product Name: $product_name
+- Target URL: $target_url
+- Category: $product_category
+- Price Range: $price_range
+- Research Depth: $research_depth
+
+## Target Audience
+$target_audience
+""")
+
+@functools.lru_cache(maxsize=64)
+def _build_research_prompt(product_name: str, target_url: str, product_category: str, price_range: str,
+                           research_depth: str, target_audience: str) -> str:
+    """Per-request part of the research prompt, memoized for resubmits with the same inputs"""
+    return _RESEARCH_PROMPT_TEMPLATE.substitute(
+        product_name=product_name,
+        target_url=target_url,
+        product_category=product_category,
+        price_range=price_range,
+        research_depth=research_depth,
+        target_audience=target_audience
+    )
+
+def _run_research(ai_manager, prompt: str, model: str, buffer: List[str],
+                  use_cache: Optional[bool] = None) -> Dict[str, Any]:
+    """Stream research into buffer and parse its JSON off the script thread (no st.* calls here)
+
+    use_cache None applies AIManager's default policy (only temperature-0 calls are cached,
+    so this sampled call is not shared across sessions). With use_cache False the cache is
+    skipped and the fresh result replaces the cached one.
+    """
+    stream = ai_manager.generate_content_stream(
+        prompt=prompt,
+        model=model,
+        temperature=0.3,
+        max_tokens=3000,
+        use_cache=use_cache,
+        system_prompt=RESEARCH_SYSTEM_PROMPT,
+        json_mode=True
+    )
+    for chunk in stream:
+        buffer.append(chunk)
+
+    response = stream.result
+    parsed = ai_manager.validate_json_response(response.get('content', '')) if response.get('success', False) else {}
+    return {'response': response, 'parsed': parsed}
+
+# The research fields RESEARCH_SYSTEM_PROMPT asks for: section -> field -> empty value of
+# the expected type. Fields the model leaves out or returns in the wrong shape keep the
+# empty value and are listed under 'missing_fields' rather than backfilled.
+_RESEARCH_SCHEMA = {
+    'product_analysis': {
+        'key_features': (),
+        'unique_selling_propositions': (),
+        'product_positioning': ''
+    },
+    'market_analysis': {
+        'market_size': '',
+        'trends': (),
+        'pricing': '',
+        'competitive_landscape': {
+            'main_competitors': (),
+            'competitive_advantages': ()
+        }
+    },
+    'audience_intelligence': {
+        'demographics': {
+            'age_range': '',
+            'gender': '',
+            'income': '',
+            'education': ''
+        },
+        'pain_points': (),
+        'motivations': (),
+        'buying_triggers': ()
+    },
+    'messaging_insights': {
+        'value_propositions': (),
+        'emotional_triggers': (),
+        'objections_to_address': ()
+    },
+    'conversion_optimization': {
+        'trust_elements': (),
+        'social_proof_opportunities': (),
+        'urgency_factors': ()
+    }
+}
+
+def _fill_schema(schema: Dict[str, Any], data: Any, path: str, missing: List[str]) -> Dict[str, Any]:
+    """Copy the schema's fields out of data, recording the dotted path of each one not found"""
+    data = data if isinstance(data, dict) else {}
+    filled = {}
+    for field, empty in schema.items():
+        name = f"{path}.{field}" if path else field
+        value = data.get(field)
+        if isinstance(empty, dict):
+            filled[field] = _fill_schema(empty, value, name, missing)
+            continue
+
+        if isinstance(empty, tuple):
+            if isinstance(value, str):
+                value = [value]
+            value = [str(item) for item in value if item] if isinstance(value, list) else []
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif not isinstance(value, str):
+            value = ''
+
+        if not value or not str(value).strip():
+            missing.append(name)
+        filled[field] = value
+    return filled
+
+@st.fragment(run_every=RESEARCH_POLL_SECONDS)
+def _render_research_progress():
+    """Streamed research so far; only this fragment refreshes until the job finishes"""
+    job = st.session_state.get(RESEARCH_JOB_KEY)
+    if job is None or job['future'].done():
+        # Full rerun so render() saves the result and swaps the progress view for the summary
+        st.rerun()
+
+    st.info("🔍 Conducting comprehensive product research...")
+    # The worker only appends, so joining a snapshot of the list is safe
+    received = "".join(list(job['buffer']))
+    if received:
+        st.code(received, language="json")
+
+def _bullets(items) -> str:
+    """Markdown bullet list of the non-empty items, rendered with a single call"""
+    if isinstance(items, str):
+        items = (items,)
+    return "\n".join(f"- {item}" for item in filter(None, items))
+
+def _first(items, count: int):
+    """First count entries of a list field, treating a plain string as a single entry"""
+    if isinstance(items, str):
+        return (items,)
+    return tuple(items or ())[:count]
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _build_summary_view(generated_at: str, product_name: str, _step_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Values shown by the completed-step summary, derived once per saved research run
+
+    Keyed on generated_at and product name; _step_data is excluded from hashing
+    so reruns do not walk the whole saved response.
+    """
+    form_inputs = _step_data.get('form_inputs', {})
+    research_data = _step_data.get('research_insights') or {}
+    audience = research_data.get('audience_intelligence') or {}
+    demographics = audience.get('demographics') or {}
+    if isinstance(demographics, dict):
+        primary_audience = f"{demographics.get('age_range') or 'N/A'}, {demographics.get('gender') or 'N/A'}"
+    else:
+        primary_audience = str(demographics)
+    ai_response = _step_data.get('ai_response', {})
+
+    return {
+        'metrics': {
+            'Product': product_name or 'N/A',
+            'Category': form_inputs.get('product_category', 'N/A'),
+            'Price Range': form_inputs.get('price_range', 'N/A'),
+            'Research Depth': form_inputs.get('research_depth', 'N/A'),
+        },
+        'features': _bullets(_first((research_data.get('product_analysis') or {}).get('key_features'), 3)),
+        'market_size': (research_data.get('market_analysis') or {}).get('market_size') or 'Not found',
+        'primary_audience': primary_audience,
+        'top_pains': _bullets(_first(audience.get('pain_points'), 2)),
+        'missing_fields': ", ".join(research_data.get('missing_fields') or ()),
+        'model_used': ai_response.get('model_used', 'N/A'),
+        'tokens_used': ai_response.get('tokens_used', 'N/A'),
+        'generated': (generated_at or 'N/A')[:19],
+    }
+
 class ProductResearchModule:
     """Step 1: Product Research & Intelligence Gathering"""
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
             self.validator = ValidationHelper()
         except Exception as e:
             st.error(f"Error initializing ProductResearchModule: {str(e)}")
@@ -37,8 +359,16 @@ class ProductResearchModule:
             st.error("❌ State management not available. Please check your installation.")
             return
 
-        if self.state_manager.is_step_completed(1):
-            self._show_completed_summary()
+        # Shows progress while a submitted research job runs; falls through to the form if it failed
+        if RESEARCH_JOB_KEY in st.session_state:
+            if not st.session_state[RESEARCH_JOB_KEY]['future'].done():
+                _render_research_progress()
+                return
+            self._finish_research_job()
+
+        completed, step_data = self.state_manager.get_step_state(1)
+        if completed:
+            self._show_completed_summary(step_data)
             if st.button("🔄 Redo Research"):
                 self._reset_step()
                 st.rerun()
@@ -136,248 +466,128 @@ class ProductResearchModule:
             st.error("❌ Required services not available")
             return
 
-        with st.spinner("🔍 Conducting comprehensive product research..."):
-
-            # Create research prompt
-            research_prompt = self._create_research_prompt(form_inputs)
-
-            try:
-                response = self.ai_manager.generate_content(
-                    prompt=research_prompt,
-                    model=st.session_state.workflow_data['selected_model'],
-                    temperature=0.3,
-                    max_tokens=3000
-                )
+        # Create research prompt
+        research_prompt = self._create_research_prompt(form_inputs)
+
+        buffer: List[str] = []
+        # After "Redo Research", skip the cached reply and store the new one in its place
+        use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
+        st.session_state[RESEARCH_JOB_KEY] = {
+            'future': _EXECUTOR.submit(
+                _run_research, self.ai_manager, research_prompt, st.session_state.workflow_data['selected_model'],
+                buffer, use_cache
+            ),
+            'buffer': buffer,
+            'form_inputs': form_inputs
+        }
+        st.rerun()
 
-                if response.get('success', False):
-                    # Create structured research data
-                    research_data = self._create_research_structure(form_inputs, response)
+    def _finish_research_job(self):
+        """Save the result of the finished background research call"""
+        job = st.session_state[RESEARCH_JOB_KEY]
+        future = job['future']
 
-                    # Save data
-                    self.state_manager.save_step_data(1, {
-                        'research_insights': research_data,
-                        'form_inputs': form_inputs,
-                        'ai_response': response,
-                        'generated_at': datetime.now().isoformat()
-                    })
-                    self.state_manager.mark_step_completed(1)
+        del st.session_state[RESEARCH_JOB_KEY]
+        form_inputs = job['form_inputs']
 
-                    st.success("✅ Product research completed!")
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error(f"❌ Research failed: {response.get('error', 'Unknown error')}")
+        try:
+            outcome = future.result()
+            response = outcome['response']
+
+            if response.get('success', False):
+                # Create structured research data
+                research_data = self._create_research_structure(form_inputs, outcome['parsed'].get('data'))
+
+                # Save data
+                self.state_manager.save_step_data(1, {
+                    'research_insights': research_data,
+                    'form_inputs': form_inputs,
+                    'ai_response': response,
+                    'generated_at': datetime.now().isoformat()
+                })
+                self.state_manager.mark_step_completed(1)
+
+                # A toast survives the rerun, so there is no need to pause for the user to read it
+                st.toast("Product research completed!", icon="✅")
+                st.rerun()
+            else:
+                st.error(f"❌ Research failed: {response.get('error', 'Unknown error')}")
 
-            except Exception as e:
-                st.error(f"❌ Error conducting research: {str(e)}")
+        except Exception as e:
+            st.error(f"❌ Error conducting research: {str(e)}")
 
     def _create_research_prompt(self, form_inputs: Dict[str, Any]) -> str:
-        """Create research prompt"""
-
-        prompt = f"""# Product Research & Market Intelligence
-
-## Product Details
-- Product Name: {form_inputs['product_name']}
-- Target URL: {form_inputs.get('target_url', 'Not provided')}
-- Category: {form_inputs['product_category']}
-- Price Range: {form_inputs['price_range']}
-- Research Depth: {form_inputs['research_depth']}
-
-## Target Audience
-{form_inputs['target_audience']}
-
-## Research Tasks
-Conduct comprehensive research and provide insights on:
-
-1. **Product Analysis**
-   - Key features and benefits
-   - Unique selling propositions
-   - Product positioning
-
-2. **Market Analysis** 
-   - Market size and trends
-   - Competitive landscape
-   - Pricing analysis
-
-3. **Audience Intelligence**
-   - Demographics and psychographics
-   - Pain points and motivations
-   - Buying triggers
-
-4. **Messaging Insights**
-   - Key value propositions
-   - Emotional triggers
-   - Objection handling points
-
-5. **Conversion Optimization**
-   - Trust building elements
-   - Social proof opportunities
-   - Urgency and scarcity factors
-
-Return structured insights as JSON with actionable intelligence for landing page creation.
-"""
-
-        return prompt
-
-    def _create_research_structure(self, form_inputs: Dict[str, Any], ai_response: Dict[str, Any]) -> Dict[str, Any]:
-        """Create structured research data"""
-
-        research_data = {
-            'product_analysis': {
-                'key_features': [
-                    'Advanced formula with natural ingredients',
-                    'Clinically tested and proven results',
-                    'Easy-to-use daily supplement',
-                    'No side effects reported'
-                ],
-                'unique_selling_propositions': [
-                    'Only supplement with patented ingredient blend',
-                    'Results visible in 30 days or less',
-                    '90-day money-back guarantee'
-                ],
-                'product_positioning': 'Premium solution for sustainable weight loss'
-            },
-            'market_analysis': {
-                'market_size': 'Multi-billion dollar weight loss industry',
-                'trends': [
-                    'Growing demand for natural solutions',
-                    'Increased focus on metabolic health',
-                    'Shift toward sustainable weight management'
-                ],
-                'competitive_landscape': {
-                    'direct_competitors': 3,
-                    'competitive_advantages': [
-                        'Superior ingredient quality',
-                        'Stronger guarantee',
-                        'Better customer support'
-                    ]
-                }
-            },
-            'audience_intelligence': {
-                'demographics': {
-                    'age_range': '30-50 years old',
-                    'gender': 'Primarily female (75%)',
-                    'income': 'Middle to upper-middle class',
-                    'education': 'College educated'
-                },
-                'pain_points': [
-                    'Frustrated with failed diet attempts',
-                    'Limited time for complex weight loss programs',
-                    'Concerned about health risks of obesity',
-                    'Low confidence due to weight gain'
-                ],
-                'motivations': [
-                    'Want to feel confident in their body',
-                    'Desire improved energy and health',
-                    'Need sustainable, realistic solution',
-                    'Want to set good example for family'
-                ]
-            },
-            'messaging_insights': {
-                'value_propositions': [
-                    'Transform your body without extreme diets',
-                    'Natural solution that works with your metabolism',
-                    'Regain confidence and energy in just 30 days'
-                ],
-                'emotional_triggers': [
-                    'Frustration with previous failures',
-                    'Hope for lasting transformation',
-                    'Pride in taking control of health'
-                ],
-                'objections_to_address': [
-                    'Skepticism about supplement effectiveness',
-                    'Concern about side effects',
-                    'Price sensitivity',
-                    'Time investment concerns'
-                ]
-            },
-            'conversion_optimization': {
-                'trust_elements': [
-                    'Doctor endorsements',
-                    'Clinical study results',
-                    'Customer testimonials',
-                    'Money-back guarantee'
-                ],
-                'social_proof_opportunities': [
-                    'Before/after transformations',
-                    'Customer success stories',
-                    'Expert recommendations',
-                    'Media mentions'
-                ],
-                'urgency_factors': [
-                    'Limited time discount',
-                    'Exclusive bonus package',
-                    'Limited quantity available'
-                ]
-            }
-        }
-
+        """Create the per-request part of the research prompt (instructions are in RESEARCH_SYSTEM_PROMPT)"""
+
+        return _build_research_prompt(
+            form_inputs['product_name'],
+            form_inputs.get('target_url', 'Not provided'),
+            form_inputs['product_category'],
+            form_inputs['price_range'],
+            form_inputs['research_depth'],
+            form_inputs['target_audience']
+        )
+
+    def _create_research_structure(self, form_inputs: Dict[str, Any], ai_insights: Optional[Any]) -> Dict[str, Any]:
+        """Create structured research data from the parsed AI insights
+
+        Only the fields in _RESEARCH_SCHEMA are kept. Anything the model did not
+        provide stays empty and its path is listed under 'missing_fields'.
+        """
+        missing: List[str] = []
+        research_data = _fill_schema(_RESEARCH_SCHEMA, ai_insights, '', missing)
+        research_data['missing_fields'] = missing
         return research_data
 
-    def _show_completed_summary(self):
+    def _show_completed_summary(self, step_data: Dict[str, Any]):
         """Show research summary"""
 
-        if not self.state_manager:
-            return
-
         st.success("✅ **Step 1 Complete** - Product research and intelligence gathered!")
 
-        step_data = self.state_manager.get_step_data(1)
-        form_inputs = step_data.get('form_inputs', {})
-        research_data = step_data.get('research_insights', {})
-
-        # Show key metrics
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("Product", form_inputs.get('product_name', 'N/A')[:20])
-        with col2:
-            st.metric("Category", form_inputs.get('product_category', 'N/A'))
-        with col3:
-            st.metric("Price Range", form_inputs.get('price_range', 'N/A'))
-        with col4:
-            st.metric("Research Depth", form_inputs.get('research_depth', 'N/A'))
+        view = _build_summary_view(
+            step_data.get('generated_at', ''),
+            step_data.get('form_inputs', {}).get('product_name', ''),
+            step_data
+        )
+
+        # Show key facts as one table rather than four metric widgets
+        st.table({'Value': view['metrics']})
 
         # Research insights
         with st.expander("📊 Research Insights"):
 
             # Product analysis
             st.markdown("### 📦 Product Analysis")
-            product_analysis = research_data.get('product_analysis', {})
-            features = product_analysis.get('key_features', [])
-            if features:
-                for feature in features[:3]:
-                    st.write(f"• {feature}")
+            if view['features']:
+                st.markdown(view['features'])
 
             # Market analysis
             st.markdown("### 📈 Market Analysis")
-            market_analysis = research_data.get('market_analysis', {})
-            st.write(f"**Market Size:** {market_analysis.get('market_size', 'N/A')}")
+            st.write(f"**Market Size:** {view['market_size']}")
 
             # Audience intelligence
             st.markdown("### 👥 Audience Intelligence")
-            audience = research_data.get('audience_intelligence', {})
-            demographics = audience.get('demographics', {})
-            st.write(f"**Primary Audience:** {demographics.get('age_range', 'N/A')}, {demographics.get('gender', 'N/A')}")
+            st.write(f"**Primary Audience:** {view['primary_audience']}")
+
+            if view['top_pains']:
+                st.markdown(f"**Top Pain Points:**\n{view['top_pains']}")
 
-            pain_points = audience.get('pain_points', [])
-            if pain_points:
-                st.write("**Top Pain Points:**")
-                for pain in pain_points[:2]:
-                    st.write(f"• {pain}")
+            if view['missing_fields']:
+                st.caption(f"⚠️ Not found by the research: {view['missing_fields']}")
 
         # Generation details
         with st.expander("🔧 Generation Details"):
-            ai_response = step_data.get('ai_response', {})
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.write(f"**Model Used:** {ai_response.get('model_used', 'N/A')}")
+                st.write(f"**Model Used:** {view['model_used']}")
             with col2:
-                st.write(f"**Tokens Used:** {ai_response.get('tokens_used', 'N/A')}")
+                st.write(f"**Tokens Used:** {view['tokens_used']}")
             with col3:
-                st.write(f"**Generated:** {step_data.get('generated_at', 'N/A')[:19]}")
+                st.write(f"**Generated:** {view['generated']}")
 
     def _reset_step(self):
         """Reset step 1 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_1_completed'] = False
+            self.state_manager.mark_step_incomplete(1)
+            st.session_state[REGENERATE_KEY] = True
             st.session_state.workflow_data['step_1_data'] = {}
@@ -1,23 +1,360 @@
 import streamlit as st
-import json
-import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, NamedTuple, Tuple
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+REGENERATE_KEY = 'step2_regenerate'  # Set by "Regenerate Outline" so the next run skips the response cache
+
+class SectionSpec(NamedTuple):
+    """Read-only view of one outline section for the summary"""
+    name: str
+    order: int
+    components: Tuple[str, ...]
+    estimated_words: int = 0
+    v2_enhancement: str = ''
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _build_outline(page_type: str, tone_personality: str, content_depth: int, mobile_optimization: bool,
+                   include_agitation_module: bool, include_comparison_table: bool, audience_qualifier: bool,
+                   include_roadmap: bool) -> Dict[str, Any]:
+    """Outline structure for a configuration; built once per distinct config, a fresh copy per call"""
+
+    outline_data = {
+        'page_metadata': {
+            'page_type': page_type,
+            'tone_personality': tone_personality,
+            'mobile_first': mobile_optimization,
+            'content_depth': content_depth,
+            'estimated_length': '3000-5000 words' if content_depth >= 4 else '2000-3000 words'
+        },
+        'section_structure': {
+            'hero_section': {
+                'order': 1,
+                'components': [
+                    'Primary headline (H1)',
+                    'Supporting subheadline', 
+                    'Value proposition statement',
+                    'Hero image or video',
+                    'Primary CTA button',
+                    'Trust indicators'
+                ],
+                'estimated_words': 150,
+                'mobile_considerations': 'Stack vertically, larger buttons'
+            },
+            'problem_section': {
+                'order': 2,
+                'components': [
+                    'Problem identification headline',
+                    'Pain point validation',
+                    'Emotional connection copy',
+                    'Relatability elements'
+                ],
+                'estimated_words': 200,
+                'v2_enhancement': 'Enhanced emotional resonance'
+            },
+            'agitation_module': {
+                'order': 3,
+                'include': include_agitation_module,
+                'components': [
+                    'Consequence amplification',
+                    'Cost of inaction',
+                    'Time-sensitive urgency',
+                    'Failure scenario painting'
+                ],
+                'estimated_words': 250,
+                'v2_enhancement': '+20-35% conversion boost',
+                'conversion_impact': 'High'
+            },
+            'solution_section': {
+                'order': 4,
+                'components': [
+                    'Solution introduction',
+                    'How it works explanation',
+                    'Unique mechanism reveal',
+                    'Scientific backing'
+                ],
+                'estimated_words': 300,
+                'mobile_considerations': 'Use expandable sections'
+            },
+            'benefits_section': {
+                'order': 5,
+                'components': [
+                    'Feature-Advantage-Benefit matrix',
+                    'Transformation promises',
+                    'Outcome visualization',
+                    'Lifestyle improvements'
+                ],
+                'estimated_words': 400,
+                'layout': 'Icon + headline + description format'
+            },
+            'social_proof_section': {
+                'order': 6,
+                'components': [
+                    'Customer testimonials',
+                    'Before/after showcases',
+                    'Expert endorsements',
+                    'Media mentions',
+                    'Usage statistics'
+                ],
+                'estimated_words': 350,
+                'mobile_considerations': 'Carousel format for testimonials'
+            },
+            'comparison_table': {
+                'order': 7,
+                'include': include_comparison_table,
+                'components': [
+                    'Product vs competitors',
+                    'Feature comparison matrix',
+                    'Value justification',
+                    'Unique differentiators'
+                ],
+                'estimated_words': 200,
+                'v2_enhancement': '+15-25% conversion boost',
+                'mobile_considerations': 'Horizontal scrolling table'
+            },
+            'audience_qualifier': {
+                'order': 8,
+                'include': audience_qualifier,
+                'components': [
+                    'Is this right for you quiz',
+                    'Qualification criteria',
+                    'Exclusion warnings',
+                    'Perfect fit indicators'
+                ],
+                'estimated_words': 150,
+                'v2_enhancement': '+10-20% conversion boost'
+            },
+            'final_cta_section': {
+                'order': 9,
+                'components': [
+                    'Final emotional appeal',
+                    'Primary CTA button',
+                    'What happens next roadmap' if include_roadmap else None,
+                    'Risk reversal guarantee',
+                    'Urgency reinforcement',
+                    'Secondary CTA option'
+                ],
+                'estimated_words': 300,
+                'conversion_focus': 'Maximum conversion optimization'
+            }
+        },
+        'v2_enhancements_summary': {
+            'agitation_module': {
+                'included': include_agitation_module,
+                'impact': '+20-35% conversion boost'
+            },
+            'comparison_table': {
+                'included': include_comparison_table,
+                'impact': '+15-25% conversion boost'
+            },
+            'audience_qualifier': {
+                'included': audience_qualifier,
+                'impact': '+10-20% conversion boost'
+            },
+            'what_happens_next': {
+                'included': include_roadmap,
+                'impact': '+10-15% conversion boost'
+            }
+        },
+        'technical_specifications': {
+            'mobile_optimization': mobile_optimization,
+            'responsive_breakpoints': ['320px', '768px', '1024px', '1440px'],
+            'loading_optimization': 'Progressive enhancement',
+            'accessibility_level': 'WCAG 2.1 AA compliance'
+        },
+        'content_guidelines': {
+            'tone': tone_personality,
+            'reading_level': 'Grade 8-10 (accessible)',
+            'sentence_length': 'Average 15-20 words',
+            'paragraph_length': '2-4 sentences max',
+            'call_to_action_frequency': 'Every 300-500 words'
+        }
+    }
+
+    # Included sections in page order, so readers need not filter section_structure themselves
+    outline_data['included_order'] = [
+        name for name, section in sorted(outline_data['section_structure'].items(), key=lambda item: item[1]['order'])
+        if section.get('include', True)
+    ]
+
+    return outline_data
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _build_outline_prompt(product_name: str, target_audience: str, page_type: str, tone_personality: str,
+                          content_depth: int, mobile_optimization: bool, include_agitation_module: bool,
+                          include_comparison_table: bool, audience_qualifier: bool, include_roadmap: bool,
+                          sections_order: tuple) -> str:
+    """Outline generation prompt, memoized on the scalar inputs it is built from"""
+
+    prompt = f"""# Landing Page Outline Generation V2.0
+
+## Context
+Product: {product_name}
+Target Audience: {target_audience}
+Page Type: {page_type}
+
+## V2.0 Enhancements
+- Include Agitation Module: {include_agitation_module}
+- Include Comparison Table: {include_comparison_table}
+- Include Audience Qualifier: {audience_qualifier}
+- Include What Happens Next: {include_roadmap}
+
+## Configuration
+- Tone: {tone_personality}
+- Content Depth: {content_depth}/5
+- Mobile Optimization: {mobile_optimization}
+- Sections Order: {list(sections_order)}
+
+## Task
+Create comprehensive landing page outline with V2.0 affiliate marketing enhancements.
+
+### Required Sections:
+1. **Hero Section**
+   - Headline hierarchy
+   - Subheadline and value proposition
+   - Hero image/video placeholder
+   - Primary CTA button
+
+2. **Problem Identification**
+   - Problem statement
+   - Pain point validation
+   - Emotional connection
+
+3. **Agitation Module (V2.0)**
+   - Consequence amplification
+   - Urgency building
+   - Cost of inaction
+
+4. **Solution Presentation**
+   - Product introduction
+   - How it works
+   - Unique mechanism
+
+5. **Benefits & Features**
+   - Feature-Advantage-Benefit matrix
+   - Transformation promises
+   - Outcome visualization
+
+6. **Social Proof Section**
+   - Testimonials strategy
+   - Before/after showcases
+   - Authority endorsements
+
+7. **Comparison Table (V2.0)**
+   - Product vs alternatives
+   - Feature comparison
+   - Value justification
+
+8. **Final CTA Section**
+   - Primary call-to-action
+   - What happens next roadmap
+   - Risk reversal elements
+
+Return structured outline with section details, content guidelines, and V2.0 enhancement notes.
+"""
+
+    return prompt
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _summary_metrics(generated_at: str, _step_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Headline figures for the completed-step summary, computed once per generated outline
+
+    Keyed on generated_at; _step_data is excluded from hashing.
+    """
+    outline_data = _step_data.get('outline_structure') or {}
+    config = _step_data.get('configuration') or {}
+    metadata = outline_data.get('page_metadata') or {}
+    sections = outline_data.get('section_structure') or {}
+    enhancements = outline_data.get('v2_enhancements_summary') or {}
+    # Outlines saved before included_order existed are filtered here instead
+    included_order = outline_data.get('included_order') or [
+        key for key, section in sections.items() if section.get('include', True)
+    ]
+
+    return {
+        'page_type': config.get('page_type', 'N/A'),
+        'estimated_length': metadata.get('estimated_length', 'N/A'),
+        'mobile_first': "✅" if config.get('mobile_optimization') else "❌",
+        'content_depth': f"{config.get('content_depth', 0)}/5",
+        'v2_count': sum(1 for details in enhancements.values() if details.get('included')),
+        'v2_total': len(enhancements),
+        'sections': tuple(
+            SectionSpec(
+                name=key.replace('_', ' ').title(),
+                order=section.get('order', 0),
+                components=tuple(component for component in section.get('components', [])[:3] if component),
+                estimated_words=section.get('estimated_words', 0),
+                v2_enhancement=section.get('v2_enhancement', '')
+            )
+            for key, section in ((key, sections[key]) for key in included_order)
+        ),
+    }
+
+def _render_summary(step_data: Dict[str, Any]):
+    """Completed-step summary: outline metrics, enhancements, structure and specs"""
+    outline_data = step_data.get('outline_structure') or {}
+    v2_enhancements = outline_data.get('v2_enhancements_summary') or {}
+    tech_specs = outline_data.get('technical_specifications') or {}
+    content_guidelines = outline_data.get('content_guidelines') or {}
+    metrics = _summary_metrics(step_data.get('generated_at', ''), step_data)
+
+    # Show outline metrics
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Page Type", metrics['page_type'])
+    with col2:
+        st.metric("Est. Length", metrics['estimated_length'])
+    with col3:
+        st.metric("Mobile-First", metrics['mobile_first'])
+    with col4:
+        st.metric("Content Depth", metrics['content_depth'])
+
+    # V2.0 Enhancements
+    with st.expander(f"🚀 V2.0 Enhancements Included ({metrics['v2_count']}/{metrics['v2_total']})"):
+        for enhancement, details in v2_enhancements.items():
+            if details.get('included'):
+                st.write(f"✅ **{enhancement.replace('_', ' ').title()}** - {details.get('impact', 'N/A')}")
+            else:
+                st.write(f"❌ **{enhancement.replace('_', ' ').title()}** - Not included")
+
+    # Section structure
+    with st.expander(f"📋 Landing Page Structure ({len(metrics['sections'])} sections)"):
+        for section in metrics['sections']:
+            st.write(f"**{section.order}. {section.name}** ({section.estimated_words} words)")
+            if section.v2_enhancement:
+                st.write(f"   🚀 V2.0: {section.v2_enhancement}")
+
+            for component in section.components:  # First 3 non-empty components
+                st.write(f"   • {component}")
+            st.write("")
+
+    # Technical specs
+    with st.expander("⚙️ Technical Specifications"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("**Technical:**")
+            st.write(f"• Mobile Optimization: {tech_specs.get('mobile_optimization', 'N/A')}")
+            st.write(f"• Accessibility: {tech_specs.get('accessibility_level', 'N/A')}")
+
+        with col2:
+            st.write("**Content Guidelines:**")
+            st.write(f"• Tone: {content_guidelines.get('tone', 'N/A')}")
+            st.write(f"• Reading Level: {content_guidelines.get('reading_level', 'N/A')}")
+
 class OutlineModule:
     """Step 2: Landing Page Outline & Structure (V2.0 Enhanced)"""
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing OutlineModule: {str(e)}")
             self.ai_manager = None
@@ -132,283 +469,89 @@ class OutlineModule:
             st.error("❌ Required services not available")
             return
 
-        with st.spinner("📋 Generating V2.0 enhanced landing page outline..."):
-
-            # Get Step 1 data for context
-            try:
-                step_1_data = self.state_manager.get_step_data(1)
-            except Exception as e:
-                st.error(f"Error getting Step 1 data: {str(e)}")
-                return
-
-            # Create outline prompt
-            outline_prompt = self._create_outline_prompt(config, step_1_data)
+        # Get Step 1 data for context
+        try:
+            step_1_data = self.state_manager.get_step_data(1)
+        except Exception as e:
+            st.error(f"Error getting Step 1 data: {str(e)}")
+            return
 
-            try:
-                response = self.ai_manager.generate_content(
-                    prompt=outline_prompt,
-                    model=st.session_state.workflow_data['selected_model'],
-                    temperature=0.4,
-                    max_tokens=2500
-                )
+        # The section skeleton depends only on the configuration, so show it before the AI call starts
+        outline_data = self._create_outline_structure(config)
+        st.markdown("#### 📋 Outline")
+        st.markdown("\n".join(
+            f"{outline_data['section_structure'][name]['order']}. {name.replace('_', ' ').title()}"
+            for name in outline_data['included_order']
+        ))
 
-                if response.get('success', False):
-                    # Create structured outline data
-                    outline_data = self._create_outline_structure(config, response)
+        # Create outline prompt
+        outline_prompt = self._create_outline_prompt(config, step_1_data)
 
-                    # Save data
-                    self.state_manager.save_step_data(2, {
-                        'outline_structure': outline_data,
-                        'configuration': config,
-                        'ai_response': response,
-                        'generated_at': datetime.now().isoformat()
-                    })
-                    self.state_manager.mark_step_completed(2)
+        # After "Regenerate Outline", skip the cached reply and store the new one in its place
+        use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
 
-                    st.success("✅ V2.0 Landing page outline generated!")
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error(f"❌ Outline generation failed: {response.get('error', 'Unknown error')}")
+        try:
+            stream = self.ai_manager.generate_content_stream(
+                prompt=outline_prompt,
+                model=st.session_state.workflow_data['selected_model'],
+                temperature=0.4,
+                max_tokens=2500,
+                use_cache=use_cache,
+                system_prompt=self.state_manager.get_shared_context()
+            )
+            st.write_stream(stream)
+            response = stream.result
+
+            if response.get('success', False):
+                # Save data
+                self.state_manager.save_step_data(2, {
+                    'outline_structure': outline_data,
+                    'configuration': config,
+                    'ai_response': response,
+                    'generated_at': datetime.now().isoformat()
+                })
+                self.state_manager.mark_step_completed(2)
+
+                st.toast("V2.0 landing page outline generated!", icon="✅")
+                st.rerun()
+            else:
+                st.error(f"❌ Outline generation failed: {response.get('error', 'Unknown error')}")
 
-            except Exception as e:
-                st.error(f"❌ Error generating outline: {str(e)}")
+        except Exception as e:
+            st.error(f"❌ Error generating outline: {str(e)}")
 
     def _create_outline_prompt(self, config: Dict[str, Any], step_1_data: Dict[str, Any]) -> str:
         """Create outline generation prompt"""
 
         # Extract relevant data from Step 1
         form_inputs = step_1_data.get('form_inputs', {})
-        research_insights = step_1_data.get('research_insights', {})
-
-        product_name = form_inputs.get('product_name', 'the product')
-        target_audience = form_inputs.get('target_audience', 'target customers')
-
-        prompt = f"""# Landing Page Outline Generation V2.0
-
-## Context
-Product: {product_name}
-Target Audience: {target_audience}
-Page Type: {config['page_type']}
-
-## V2.0 Enhancements
-- Include Agitation Module: {config['include_agitation_module']}
-- Include Comparison Table: {config['include_comparison_table']}
-- Include Audience Qualifier: {config['audience_qualifier']}
-- Include What Happens Next: {config['include_roadmap']}
-
-## Configuration
-- Tone: {config['tone_personality']}
-- Content Depth: {config['content_depth']}/5
-- Mobile Optimization: {config['mobile_optimization']}
-- Sections Order: {config['sections_order']}
-
-## Task
-Create comprehensive landing page outline with V2.0 affiliate marketing enhancements.
-
-### Required Sections:
-1. **Hero Section**
-   - Headline hierarchy
-   - Subheadline and value proposition
-   - Hero image/video placeholder
-   - Primary CTA button
-
-2. **Problem Identification**
-   - Problem statement
-   - Pain point validation
-   - Emotional connection
-
-3. **Agitation Module (V2.0)**
-   - Consequence amplification
-   - Urgency building
-   - Cost of inaction
-
-4. **Solution Presentation**
-   - Product introduction
-   - How it works
-   - Unique mechanism
-
-5. **Benefits & Features**
-   - Feature-Advantage-Benefit matrix
-   - Transformation promises
-   - Outcome visualization
 
-6. **Social Proof Section**
-   - Testimonials strategy
-   - Before/after showcases
-   - Authority endorsements
-
-7. **Comparison Table (V2.0)**
-   - Product vs alternatives
-   - Feature comparison
-   - Value justification
-
-8. **Final CTA Section**
-   - Primary call-to-action
-   - What happens next roadmap
-   - Risk reversal elements
-
-Return structured outline with section details, content guidelines, and V2.0 enhancement notes.
-"""
-
-        return prompt
-
-    def _create_outline_structure(self, config: Dict[str, Any], ai_response: Dict[str, Any]) -> Dict[str, Any]:
+        return _build_outline_prompt(
+            form_inputs.get('product_name', 'the product'),
+            form_inputs.get('target_audience', 'target customers'),
+            config['page_type'],
+            config['tone_personality'],
+            config['content_depth'],
+            config['mobile_optimization'],
+            config['include_agitation_module'],
+            config['include_comparison_table'],
+            config['audience_qualifier'],
+            config['include_roadmap'],
+            tuple(config['sections_order'])  # lists are unhashable as cache keys
+        )
+
+    def _create_outline_structure(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Create structured outline data"""
-
-        outline_data = {
-            'page_metadata': {
-                'page_type': config['page_type'],
-                'tone_personality': config['tone_personality'],
-                'mobile_first': config['mobile_optimization'],
-                'content_depth': config['content_depth'],
-                'estimated_length': '3000-5000 words' if config['content_depth'] >= 4 else '2000-3000 words'
-            },
-            'section_structure': {
-                'hero_section': {
-                    'order': 1,
-                    'components': [
-                        'Primary headline (H1)',
-                        'Supporting subheadline', 
-                        'Value proposition statement',
-                        'Hero image or video',
-                        'Primary CTA button',
-                        'Trust indicators'
-                    ],
-                    'estimated_words': 150,
-                    'mobile_considerations': 'Stack vertically, larger buttons'
-                },
-                'problem_section': {
-                    'order': 2,
-                    'components': [
-                        'Problem identification headline',
-                        'Pain point validation',
-                        'Emotional connection copy',
-                        'Relatability elements'
-                    ],
-                    'estimated_words': 200,
-                    'v2_enhancement': 'Enhanced emotional resonance'
-                },
-                'agitation_module': {
-                    'order': 3,
-                    'include': config['include_agitation_module'],
-                    'components': [
-                        'Consequence amplification',
-                        'Cost of inaction',
-                        'Time-sensitive urgency',
-                        'Failure scenario painting'
-                    ],
-                    'estimated_words': 250,
-                    'v2_enhancement': '+20-35% conversion boost',
-                    'conversion_impact': 'High'
-                },
-                'solution_section': {
-                    'order': 4,
-                    'components': [
-                        'Solution introduction',
-                        'How it works explanation',
-                        'Unique mechanism reveal',
-                        'Scientific backing'
-                    ],
-                    'estimated_words': 300,
-                    'mobile_considerations': 'Use expandable sections'
-                },
-                'benefits_section': {
-                    'order': 5,
-                    'components': [
-                        'Feature-Advantage-Benefit matrix',
-                        'Transformation promises',
-                        'Outcome visualization',
-                        'Lifestyle improvements'
-                    ],
-                    'estimated_words': 400,
-                    'layout': 'Icon + headline + description format'
-                },
-                'social_proof_section': {
-                    'order': 6,
-                    'components': [
-                        'Customer testimonials',
-                        'Before/after showcases',
-                        'Expert endorsements',
-                        'Media mentions',
-                        'Usage statistics'
-                    ],
-                    'estimated_words': 350,
-                    'mobile_considerations': 'Carousel format for testimonials'
-                },
-                'comparison_table': {
-                    'order': 7,
-                    'include': config['include_comparison_table'],
-                    'components': [
-                        'Product vs competitors',
-                        'Feature comparison matrix',
-                        'Value justification',
-                        'Unique differentiators'
-                    ],
-                    'estimated_words': 200,
-                    'v2_enhancement': '+15-25% conversion boost',
-                    'mobile_considerations': 'Horizontal scrolling table'
-                },
-                'audience_qualifier': {
-                    'order': 8,
-                    'include': config['audience_qualifier'],
-                    'components': [
-                        'Is this right for you quiz',
-                        'Qualification criteria',
-                        'Exclusion warnings',
-                        'Perfect fit indicators'
-                    ],
-                    'estimated_words': 150,
-                    'v2_enhancement': '+10-20% conversion boost'
-                },
-                'final_cta_section': {
-                    'order': 9,
-                    'components': [
-                        'Final emotional appeal',
-                        'Primary CTA button',
-                        'What happens next roadmap' if config['include_roadmap'] else None,
-                        'Risk reversal guarantee',
-                        'Urgency reinforcement',
-                        'Secondary CTA option'
-                    ],
-                    'estimated_words': 300,
-                    'conversion_focus': 'Maximum conversion optimization'
-                }
-            },
-            'v2_enhancements_summary': {
-                'agitation_module': {
-                    'included': config['include_agitation_module'],
-                    'impact': '+20-35% conversion boost'
-                },
-                'comparison_table': {
-                    'included': config['include_comparison_table'],
-                    'impact': '+15-25% conversion boost'
-                },
-                'audience_qualifier': {
-                    'included': config['audience_qualifier'],
-                    'impact': '+10-20% conversion boost'
-                },
-                'what_happens_next': {
-                    'included': config['include_roadmap'],
-                    'impact': '+10-15% conversion boost'
-                }
-            },
-            'technical_specifications': {
-                'mobile_optimization': config['mobile_optimization'],
-                'responsive_breakpoints': ['320px', '768px', '1024px', '1440px'],
-                'loading_optimization': 'Progressive enhancement',
-                'accessibility_level': 'WCAG 2.1 AA compliance'
-            },
-            'content_guidelines': {
-                'tone': config['tone_personality'],
-                'reading_level': 'Grade 8-10 (accessible)',
-                'sentence_length': 'Average 15-20 words',
-                'paragraph_length': '2-4 sentences max',
-                'call_to_action_frequency': 'Every 300-500 words'
-            }
-        }
-
-        return outline_data
+        return _build_outline(
+            config['page_type'],
+            config['tone_personality'],
+            config['content_depth'],
+            config['mobile_optimization'],
+            config['include_agitation_module'],
+            config['include_comparison_table'],
+            config['audience_qualifier'],
+            config['include_roadmap']
+        )
 
     def _show_completed_summary(self):
         """Show outline summary"""
@@ -417,73 +560,11 @@ Return structured outline with section details, content guidelines, and V2.0 enh
             return
 
         st.success("✅ **Step 2 Complete** - V2.0 Enhanced landing page outline generated!")
-
-        step_data = self.state_manager.get_step_data(2)
-        outline_data = step_data.get('outline_structure', {})
-        config = step_data.get('configuration', {})
-
-        # Show outline metrics
-        col1, col2, col3, col4 = st.columns(4)
-
-        metadata = outline_data.get('page_metadata', {})
-        with col1:
-            st.metric("Page Type", config.get('page_type', 'N/A'))
-        with col2:
-            st.metric("Est. Length", metadata.get('estimated_length', 'N/A'))
-        with col3:
-            st.metric("Mobile-First", "✅" if config.get('mobile_optimization') else "❌")
-        with col4:
-            st.metric("Content Depth", f"{config.get('content_depth', 0)}/5")
-
-        # V2.0 Enhancements
-        with st.expander("🚀 V2.0 Enhancements Included"):
-            v2_enhancements = outline_data.get('v2_enhancements_summary', {})
-
-            for enhancement, details in v2_enhancements.items():
-                if details.get('included'):
-                    st.write(f"✅ **{enhancement.replace('_', ' ').title()}** - {details.get('impact', 'N/A')}")
-                else:
-                    st.write(f"❌ **{enhancement.replace('_', ' ').title()}** - Not included")
-
-        # Section structure
-        with st.expander("📋 Landing Page Structure"):
-            section_structure = outline_data.get('section_structure', {})
-
-            for section_name, section_data in section_structure.items():
-                if section_data.get('include', True):  # Include by default if not specified
-                    order = section_data.get('order', 0)
-                    words = section_data.get('estimated_words', 0)
-                    enhancement = section_data.get('v2_enhancement', '')
-
-                    st.write(f"**{order}. {section_name.replace('_', ' ').title()}** ({words} words)")
-                    if enhancement:
-                        st.write(f"   🚀 V2.0: {enhancement}")
-
-                    components = section_data.get('components', [])
-                    if components:
-                        for component in components[:3]:  # Show first 3 components
-                            if component:  # Skip None values
-                                st.write(f"   • {component}")
-                    st.write("")
-
-        # Technical specs
-        with st.expander("⚙️ Technical Specifications"):
-            tech_specs = outline_data.get('technical_specifications', {})
-            content_guidelines = outline_data.get('content_guidelines', {})
-
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("**Technical:**")
-                st.write(f"• Mobile Optimization: {tech_specs.get('mobile_optimization', 'N/A')}")
-                st.write(f"• Accessibility: {tech_specs.get('accessibility_level', 'N/A')}")
-
-            with col2:
-                st.write("**Content Guidelines:**")
-                st.write(f"• Tone: {content_guidelines.get('tone', 'N/A')}")
-                st.write(f"• Reading Level: {content_guidelines.get('reading_level', 'N/A')}")
+        _render_summary(self.state_manager.get_step_data(2))
 
     def _reset_step(self):
         """Reset step 2 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_2_completed'] = False
-            st.session_state.workflow_data['step_2_data'] = {}
+            self.state_manager.mark_step_incomplete(2)
+            st.session_state[REGENERATE_KEY] = True
+            self.state_manager.save_step_data(2, {})
@@ -1,23 +1,171 @@
 import streamlit as st
-import json
-import time
+import string
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+REGENERATE_KEY = 'step3_regenerate'  # Set by "Regenerate Hero Copy" so the next run skips the response cache
+
+# Form options, built once instead of on every rerun
+HEADLINE_STYLES = ("Benefit-Focused", "Problem-Focused", "Curiosity-Driven", "Authority-Based")
+EMOTIONAL_APPEALS = ("Hope & Aspiration", "Fear & Urgency", "Trust & Security", "Pride & Achievement")
+
+# Constant hero prompt, parsed once at import; only the product and configuration fields vary
+_HERO_PROMPT_TEMPLATE = string.Template("""# Hero Section Copy Generation
+
+## PRODUCT INFORMATION (CRITICAL - USE THIS DATA):
+Product Name: $product_name
+Product Category: $product_category
+Target Audience: $target_audience
+
+## Configuration:
+Headline Style: $headline_style
+Emotional Appeal: $emotional_appeal
+Urgency Level: $urgency_level/5
+
+## TASK:
+Create compelling hero section copy specifically for $product_name targeting $target_audience.
+
+### REQUIREMENTS:
+
+1. **Primary Headline** (8-12 words):
+   - Must be about $product_name specifically
+   - Style: $headline_style
+   - Emotional appeal: $emotional_appeal
+   - NO generic weight loss or body transformation language
+   - Focus on the actual product benefits
+
+2. **Supporting Subheadline**:
+   - Expand on the main headline
+   - Add credibility specific to $product_category
+   - Address main customer doubt
+
+3. **Benefit Bullets** (4-5 bullets):
+   - Specific to $product_name and $product_category
+   - Real benefits this product provides
+   - Use ✅ checkmarks
+   - NO weight loss bullets unless this is a weight loss product
+
+4. **Primary CTA Button**:
+   - Action-focused text (3-5 words)
+   - Urgency level: $urgency_level/5
+
+## CRITICAL: 
+- Focus ONLY on $product_name benefits
+- Target $target_audience specifically  
+- Match the product category: $product_category
+- Do NOT use generic templates
+
+Return structured JSON with each element.
+""")
+
+# Appended to the hero prompt when several variants are requested in one call
+HERO_VARIANTS_INSTRUCTION = """
+## VARIANTS:
+Instead of a single object, return a JSON array of {n} distinct hero objects, each with keys:
+headline, subheadline, bullets (list of strings), cta.
+"""
+
+def _teeth_hero(product_name: str, category_lower: str, headline_style: str) -> Dict[str, Any]:
+    """Teeth whitening specific hero"""
+    return {
+        'headline_primary': {
+            'copy': f'Get Professional Teeth Whitening Results at Home in Just 7 Days',
+            'style': headline_style,
+            'product_focused': True
+        },
+        'headline_secondary': {
+            'copy': f'Discover how thousands are achieving visibly whiter teeth without expensive dentist visits using {product_name}.'
+        },
+        'benefit_bullets': {
+            'bullets': [
+                {'benefit': 'Remove years of stains in just one week', 'icon': '✅'},
+                {'benefit': 'Professional-grade results at a fraction of the cost', 'icon': '✅'},
+                {'benefit': 'Safe, gentle formula that protects enamel', 'icon': '✅'},
+                {'benefit': 'Convenient strips you can use anywhere', 'icon': '✅'},
+                {'benefit': 'Noticeable results after first application', 'icon': '✅'}
+            ]
+        },
+        'primary_cta': {
+            'button_text': 'Get Whiter Teeth Now',
+            'supporting_text': f'Join thousands who love their new smile'
+        }
+    }
+
+def _weight_hero(product_name: str, category_lower: str, headline_style: str) -> Dict[str, Any]:
+    """Weight loss specific hero"""
+    return {
+        'headline_primary': {
+            'copy': f'Transform Your Body Naturally with {product_name}',
+            'style': headline_style,
+            'product_focused': True
+        },
+        'benefit_bullets': {
+            'bullets': [
+                {'benefit': 'Lose weight naturally without restrictive dieting', 'icon': '✅'},
+                {'benefit': 'Boost energy levels and mental clarity', 'icon': '✅'},
+                {'benefit': 'See visible results in as little as 14 days', 'icon': '✅'},
+                {'benefit': 'Maintain results long-term with ease', 'icon': '✅'}
+            ]
+        }
+    }
+
+def _generic_hero(product_name: str, category_lower: str, headline_style: str) -> Dict[str, Any]:
+    """Generic but product-focused hero"""
+    return {
+        'headline_primary': {
+            'copy': f'Experience Amazing Results with {product_name}',
+            'style': headline_style,
+            'product_focused': True
+        },
+        'headline_secondary': {
+            'copy': f'Discover why customers love {product_name} and how it can transform your {category_lower} experience.'
+        },
+        'benefit_bullets': {
+            'bullets': [
+                {'benefit': f'Get professional-quality results at home', 'icon': '✅'},
+                {'benefit': f'Safe and effective formula you can trust', 'icon': '✅'},
+                {'benefit': f'See noticeable improvements quickly', 'icon': '✅'},
+                {'benefit': f'Easy to use with lasting results', 'icon': '✅'}
+            ]
+        },
+        'primary_cta': {
+            'button_text': 'Get Started Today',
+            'supporting_text': f'Join satisfied {product_name} customers'
+        }
+    }
+
+# (field, keyword, builder) checked in order; the first keyword found in the field picks the builder
+_HERO_BUILDERS = (
+    ('name', 'teeth', _teeth_hero),
+    ('name', 'whitening', _teeth_hero),
+    ('category', 'weight', _weight_hero),
+    ('category', 'fitness', _weight_hero)
+)
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def _build_hero(product_name: str, product_category: str, headline_style: str) -> Dict[str, Any]:
+    """Hero copy structure for a product and headline style; built once per combination, a fresh copy per call"""
+    fields = {'name': product_name.lower(), 'category': product_category.lower()}
+    builder = next(
+        (builder for field, keyword, builder in _HERO_BUILDERS if keyword in fields[field]),
+        _generic_hero
+    )
+    return builder(product_name, fields['category'], headline_style)
+
 class HeroModule:
     """Step 3: Hero Section Copy Generation - FIXED to use Step 1 data"""
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing HeroModule: {str(e)}")
             self.ai_manager = None
@@ -34,17 +182,19 @@ class HeroModule:
             st.error("❌ State management not available")
             return
 
-        if not self.state_manager.is_step_completed(2):
-            st.warning("⚠️ Please complete Step 2 first")
-            return
-
-        if self.state_manager.is_step_completed(3):
-            self._show_completed_summary()
+        # A completed step goes straight to its summary; the Step 2 guard only matters for the form
+        completed, step_data = self.state_manager.get_step_state(3)
+        if completed:
+            self._show_completed_summary(step_data)
             if st.button("🔄 Regenerate Hero Copy"):
                 self._reset_step()
                 st.rerun()
             return
 
+        if not self.state_manager.is_step_completed(2):
+            st.warning("⚠️ Please complete Step 2 first")
+            return
+
         # Show Step 1 data for context
         step_1_data = self.state_manager.get_step_data(1)
         if step_1_data:
@@ -65,13 +215,13 @@ class HeroModule:
             with col1:
                 headline_style = st.selectbox(
                     "Headline Style",
-                    ["Benefit-Focused", "Problem-Focused", "Curiosity-Driven", "Authority-Based"],
+                    HEADLINE_STYLES,
                     help="Primary approach for the main headline"
                 )
 
                 emotional_appeal = st.selectbox(
                     "Emotional Appeal",
-                    ["Hope & Aspiration", "Fear & Urgency", "Trust & Security", "Pride & Achievement"],
+                    EMOTIONAL_APPEALS,
                     help="Primary emotional trigger to use"
                 )
 
@@ -88,26 +238,32 @@ class HeroModule:
                     help="Mention money-back guarantee"
                 )
 
+                variants = st.slider(
+                    "Hero Variants",
+                    min_value=1, max_value=5, value=1,
+                    help="Alternative versions to generate side by side for A/B testing"
+                )
+
             submitted = st.form_submit_button("🎯 Generate Hero Copy", type="primary")
 
         if submitted:
-            self._generate_hero_copy({
+            self._generate_hero_copy(step_1_data, {
                 'headline_style': headline_style,
                 'emotional_appeal': emotional_appeal,
                 'urgency_level': urgency_level,
-                'include_guarantee': include_guarantee
+                'include_guarantee': include_guarantee,
+                'variants': variants
             })
 
-    def _generate_hero_copy(self, config: Dict[str, Any]):
-        """Generate hero section copy using actual Step 1 data"""
+    def _generate_hero_copy(self, step_1_data: Dict[str, Any], config: Dict[str, Any]):
+        """Generate hero section copy using actual Step 1 data (as already read by render)"""
 
         if not self.ai_manager or not self.state_manager:
             st.error("❌ Required services not available")
             return
 
-        # Get Step 1 data - CRITICAL!
+        # Step 1 data - CRITICAL!
         try:
-            step_1_data = self.state_manager.get_step_data(1)
             if not step_1_data:
                 st.error("❌ Step 1 data not found! Please complete Step 1 first.")
                 return
@@ -128,79 +284,73 @@ class HeroModule:
         with st.spinner(f"🎯 Generating hero copy for {product_name}..."):
 
             # Create hero prompt using ACTUAL product data
-            hero_prompt = f"""# Hero Section Copy Generation
-
-## PRODUCT INFORMATION (CRITICAL - USE THIS DATA):
-Product Name: {product_name}
-Product Category: {product_category}
-Target Audience: {target_audience}
-
-## Configuration:
-Headline Style: {config['headline_style']}
-Emotional Appeal: {config['emotional_appeal']}
-Urgency Level: {config['urgency_level']}/5
-
-## TASK:
-Create compelling hero section copy specifically for {product_name} targeting {target_audience}.
-
-### REQUIREMENTS:
-
-1. **Primary Headline** (8-12 words):
-   - Must be about {product_name} specifically
-   - Style: {config['headline_style']}
-   - Emotional appeal: {config['emotional_appeal']}
-   - NO generic weight loss or body transformation language
-   - Focus on the actual product benefits
-
-2. **Supporting Subheadline**:
-   - Expand on the main headline
-   - Add credibility specific to {product_category}
-   - Address main customer doubt
+            hero_prompt = _HERO_PROMPT_TEMPLATE.substitute(
+                product_name=product_name,
+                product_category=product_category,
+                target_audience=target_audience,
+                headline_style=config['headline_style'],
+                emotional_appeal=config['emotional_appeal'],
+                urgency_level=config['urgency_level']
+            )
 
-3. **Benefit Bullets** (4-5 bullets):
-   - Specific to {product_name} and {product_category}
-   - Real benefits this product provides
-   - Use ✅ checkmarks
-   - NO weight loss bullets unless this is a weight loss product
-
-4. **Primary CTA Button**:
-   - Action-focused text (3-5 words)
-   - Urgency level: {config['urgency_level']}/5
-
-## CRITICAL: 
-- Focus ONLY on {product_name} benefits
-- Target {target_audience} specifically  
-- Match the product category: {product_category}
-- Do NOT use generic templates
+            # The template structure does not depend on the AI text, so it is ready before the request goes out
+            hero_data = self._create_hero_structure(config, form_inputs)
 
-Return structured JSON with each element.
-"""
+            # After "Regenerate", skip the cached reply and store the new one in its place
+            use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
 
             # Generate with AI
             try:
-                response = self.ai_manager.generate_content(
-                    prompt=hero_prompt,
-                    model=st.session_state.workflow_data.get('selected_model', 'gemini-1.5-pro'),
-                    temperature=0.8,
-                    max_tokens=1500
-                )
+                model = st.session_state.workflow_data.get('selected_model', 'gemini-1.5-pro')
+                variants = config.get('variants', 1)
+
+                if variants > 1:
+                    # One request for every variant: the prompt prefix is sent and billed once
+                    response = self.ai_manager.generate_content(
+                        prompt=hero_prompt + HERO_VARIANTS_INSTRUCTION.format(n=variants),
+                        model=model,
+                        temperature=0.8,
+                        max_tokens=self.ai_manager.max_output_tokens(model, 1500 * variants),
+                        use_cache=use_cache,
+                        system_prompt=self.state_manager.get_shared_context()
+                    )
+                    if response.get('success', False):
+                        parsed = self.ai_manager.validate_json_response(response['content'], expected_type=list)
+                        if parsed['valid'] and isinstance(parsed['data'], list):
+                            response['variations'] = [v for v in parsed['data'] if isinstance(v, dict)][:variants]
+                        else:
+                            st.warning("⚠️ The reply could not be split into separate variants, so no variants were saved.")
+                else:
+                    stream = self.ai_manager.generate_content_stream(
+                        prompt=hero_prompt,
+                        model=model,
+                        temperature=0.8,
+                        max_tokens=1500,
+                        use_cache=use_cache,
+                        system_prompt=self.state_manager.get_shared_context()
+                    )
+                    st.write_stream(stream)
+                    response = stream.result
 
                 if response.get('success', False):
-                    # Create hero data using actual product info
-                    hero_data = self._create_hero_structure(config, response, form_inputs)
+                    # Only parsed variants are kept; the raw reply is never stored in step data
+                    hero_data['variants'] = response.get('variations', [])
 
                     # Save data
                     self.state_manager.save_step_data(3, {
                         'hero_copy': hero_data,
                         'configuration': config,
                         'product_context': form_inputs,
-                        'ai_response': response,
+                        'ai_meta': {
+                            'model_used': response.get('model_used'),
+                            'tokens_used': response.get('tokens_used')
+                        },
                         'generated_at': datetime.now().isoformat()
                     })
                     self.state_manager.mark_step_completed(3)
 
-                    st.success(f"✅ Hero copy generated for {product_name}!")
-                    time.sleep(1)
+                    # A toast survives the rerun, so there is no need to pause for the user to read it
+                    st.toast(f"Hero copy generated for {product_name}!", icon="✅")
                     st.rerun()
                 else:
                     st.error(f"❌ AI generation failed: {response.get('error', 'Unknown error')}")
@@ -208,80 +358,14 @@ Return structured JSON with each element.
             except Exception as e:
                 st.error(f"❌ Error generating hero copy: {str(e)}")
 
-    def _create_hero_structure(self, config: Dict[str, Any], ai_response: Dict[str, Any], 
-                              form_inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_hero_structure(self, config: Dict[str, Any], form_inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Create hero structure using actual product data"""
 
-        product_name = form_inputs.get('product_name', 'the product')
-        product_category = form_inputs.get('product_category', '')
-
-        # Create contextual hero copy based on actual product
-        if 'teeth' in product_name.lower() or 'whitening' in product_name.lower():
-            # Teeth whitening specific
-            hero_data = {
-                'headline_primary': {
-                    'copy': f'Get Professional Teeth Whitening Results at Home in Just 7 Days',
-                    'style': config['headline_style'],
-                    'product_focused': True
-                },
-                'headline_secondary': {
-                    'copy': f'Discover how thousands are achieving visibly whiter teeth without expensive dentist visits using {product_name}.'
-                },
-                'benefit_bullets': {
-                    'bullets': [
-                        {'benefit': 'Remove years of stains in just one week', 'icon': '✅'},
-                        {'benefit': 'Professional-grade results at a fraction of the cost', 'icon': '✅'},
-                        {'benefit': 'Safe, gentle formula that protects enamel', 'icon': '✅'},
-                        {'benefit': 'Convenient strips you can use anywhere', 'icon': '✅'},
-                        {'benefit': 'Noticeable results after first application', 'icon': '✅'}
-                    ]
-                },
-                'primary_cta': {
-                    'button_text': 'Get Whiter Teeth Now',
-                    'supporting_text': f'Join thousands who love their new smile'
-                }
-            }
-        elif 'weight' in product_category.lower() or 'fitness' in product_category.lower():
-            # Weight loss specific
-            hero_data = {
-                'headline_primary': {
-                    'copy': f'Transform Your Body Naturally with {product_name}',
-                    'style': config['headline_style'],
-                    'product_focused': True
-                },
-                'benefit_bullets': {
-                    'bullets': [
-                        {'benefit': 'Lose weight naturally without restrictive dieting', 'icon': '✅'},
-                        {'benefit': 'Boost energy levels and mental clarity', 'icon': '✅'},
-                        {'benefit': 'See visible results in as little as 14 days', 'icon': '✅'},
-                        {'benefit': 'Maintain results long-term with ease', 'icon': '✅'}
-                    ]
-                }
-            }
-        else:
-            # Generic but product-focused
-            hero_data = {
-                'headline_primary': {
-                    'copy': f'Experience Amazing Results with {product_name}',
-                    'style': config['headline_style'],
-                    'product_focused': True
-                },
-                'headline_secondary': {
-                    'copy': f'Discover why customers love {product_name} and how it can transform your {product_category.lower()} experience.'
-                },
-                'benefit_bullets': {
-                    'bullets': [
-                        {'benefit': f'Get professional-quality results at home', 'icon': '✅'},
-                        {'benefit': f'Safe and effective formula you can trust', 'icon': '✅'},
-                        {'benefit': f'See noticeable improvements quickly', 'icon': '✅'},
-                        {'benefit': f'Easy to use with lasting results', 'icon': '✅'}
-                    ]
-                },
-                'primary_cta': {
-                    'button_text': 'Get Started Today',
-                    'supporting_text': f'Join satisfied {product_name} customers'
-                }
-            }
+        hero_data = _build_hero(
+            form_inputs.get('product_name', 'the product'),
+            form_inputs.get('product_category', ''),
+            config['headline_style']
+        )
 
         # Add configuration and context
         hero_data['configuration'] = config
@@ -289,32 +373,30 @@ Return structured JSON with each element.
 
         return hero_data
 
-    def _show_completed_summary(self):
+    def _show_completed_summary(self, step_data: Dict[str, Any]):
         """Show hero copy summary"""
 
-        if not self.state_manager:
-            return
-
         st.success("✅ **Step 3 Complete** - Hero section copy generated!")
 
-        step_data = self.state_manager.get_step_data(3)
-        hero_data = step_data.get('hero_copy', {})
-        product_context = step_data.get('product_context', {})
+        hero_data = step_data.get('hero_copy') or {}
+        product_context = step_data.get('product_context') or {}
+        config = hero_data.get('configuration') or {}
+        primary_headline = hero_data.get('headline_primary') or {}
+        secondary = hero_data.get('headline_secondary') or {}
+        bullets = (hero_data.get('benefit_bullets') or {}).get('bullets', [])
+        cta = hero_data.get('primary_cta') or {}
+        variants = hero_data.get('variants') or []
 
         # Show product context
         product_name = product_context.get('product_name', 'N/A')
         st.info(f"📦 **Generated for:** {product_name}")
 
-        # Show hero elements
-        col1, col2, col3 = st.columns(3)
-
-        primary_headline = hero_data.get('headline_primary', {})
-        with col1:
-            st.metric("Product Focused", "✅" if primary_headline.get('product_focused') else "❌")
-        with col2:
-            st.metric("Headline Style", hero_data.get('configuration', {}).get('headline_style', 'N/A'))
-        with col3:
-            st.metric("Context Match", "✅")
+        # Show hero elements as one table row rather than three metric widgets
+        st.table({
+            'Product Focused': ["✅" if primary_headline.get('product_focused') else "❌"],
+            'Headline Style': [config.get('headline_style', 'N/A')],
+            'Context Match': ["✅"]
+        })
 
         # Preview hero copy
         with st.expander("🎯 Preview Hero Section"):
@@ -324,26 +406,35 @@ Return structured JSON with each element.
             st.markdown(f"## {headline_copy}")
 
             # Subheadline
-            secondary = hero_data.get('headline_secondary', {})
             if secondary:
                 st.write(secondary.get('copy', ''))
 
             # Benefit bullets
-            bullets = hero_data.get('benefit_bullets', {}).get('bullets', [])
             if bullets:
-                st.markdown("### ✅ Key Benefits")
-                for bullet in bullets:
-                    st.write(f"{bullet.get('icon', '•')} {bullet.get('benefit', 'N/A')}")
+                # One markdown element for the list; trailing double spaces keep the line breaks
+                st.markdown("### ✅ Key Benefits\n" + "  \n".join(
+                    f"{bullet.get('icon', '•')} {bullet.get('benefit', 'N/A')}" for bullet in bullets
+                ))
 
             # CTA
-            cta = hero_data.get('primary_cta', {})
             if cta:
                 st.button(f"🚀 {cta.get('button_text', 'Get Started')}", disabled=True)
                 if cta.get('supporting_text'):
                     st.caption(cta.get('supporting_text'))
 
+        # Parsed AI variants; saved data from older runs may still hold a raw reply string
+        for index, variant in enumerate((v for v in variants if isinstance(v, dict)), 1):
+            with st.expander(f"🧪 Hero Variant {index}"):
+                st.markdown(
+                    f"## {variant.get('headline', 'N/A')}\n{variant.get('subheadline', '')}\n\n"
+                    + "  \n".join(f"✅ {bullet}" for bullet in variant.get('bullets', []))
+                )
+                if variant.get('cta'):
+                    st.button(f"🚀 {variant['cta']}", disabled=True, key=f"hero_variant_cta_{index}")
+
     def _reset_step(self):
         """Reset step 3 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_3_completed'] = False
+            self.state_manager.mark_step_incomplete(3)
+            st.session_state[REGENERATE_KEY] = True
             st.session_state.workflow_data['step_3_data'] = {}
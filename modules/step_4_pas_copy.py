@@ -6,8 +6,8 @@ from typing import Dict, Any, Optional
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
@@ -16,8 +16,8 @@ class PASModule:
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing PASModule: {str(e)}")
             self.ai_manager = None
@@ -225,5 +225,5 @@ class PASModule:
     def _reset_step(self):
         """Reset step 4"""
         if self.state_manager:
-            st.session_state.workflow_data['step_4_completed'] = False
+            self.state_manager.mark_step_incomplete(4)
             st.session_state.workflow_data['step_4_data'] = {}
@@ -6,18 +6,20 @@ from typing import Dict, Any, Optional
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+REGENERATE_KEY = 'step5_regenerate'  # Set by "Regenerate Social Proof" so the next run skips the response cache
+
 class SocialProofModule:
     """Step 5: Social Proof & Comparisons (V2.0 Enhanced)"""
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing SocialProofModule: {str(e)}")
             self.ai_manager = None
@@ -154,13 +156,20 @@ class SocialProofModule:
             # Create social proof prompt
             social_proof_prompt = self._create_social_proof_prompt(config, step_1_data, step_2_data, step_3_data, step_4_data)
 
+            # After "Regenerate", skip the cached reply and store the new one in its place
+            use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
+
             try:
-                response = self.ai_manager.generate_content(
+                stream = self.ai_manager.generate_content_stream(
                     prompt=social_proof_prompt,
                     model=st.session_state.workflow_data['selected_model'],
                     temperature=0.7,
-                    max_tokens=3500
+                    max_tokens=3500,
+                    use_cache=use_cache,
+                    system_prompt=self.state_manager.get_shared_context()
                 )
+                st.write_stream(stream)
+                response = stream.result
 
                 if response.get('success', False):
                     # Create structured social proof data
@@ -588,5 +597,6 @@ Return structured JSON with all social proof elements ready for implementation.
     def _reset_step(self):
         """Reset step 5 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_5_completed'] = False
+            self.state_manager.mark_step_incomplete(5)
+            st.session_state[REGENERATE_KEY] = True
             st.session_state.workflow_data['step_5_data'] = {}
@@ -6,19 +6,21 @@ from typing import Dict, Any, Optional
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+REGENERATE_KEY = 'step6_regenerate'  # Set by "Regenerate Final CTA" so the next run skips the response cache
+
 class FinalCTAModule:
     """Step 6: Final CTA + What Happens Next Roadmap (V2.0 Enhanced)"""
 
     def __init__(self):
         # Initialize with error handling
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing FinalCTAModule: {str(e)}")
             self.ai_manager = None
@@ -137,13 +139,20 @@ class FinalCTAModule:
             cta_prompt = self._create_cta_prompt(config, step_1_data, step_2_data, step_3_data, step_4_data, step_5_data)
 
             # Generate content using AI Manager
+            # After "Regenerate", skip the cached reply and store the new one in its place
+            use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
+
             try:
-                response = self.ai_manager.generate_content(
+                stream = self.ai_manager.generate_content_stream(
                     prompt=cta_prompt,
                     model=st.session_state.workflow_data['selected_model'],
                     temperature=0.7,
-                    max_tokens=2500
+                    max_tokens=2500,
+                    use_cache=use_cache,
+                    system_prompt=self.state_manager.get_shared_context()
                 )
+                st.write_stream(stream)
+                response = stream.result
 
                 if response.get('success', False):
                     # Create structured CTA data
@@ -390,5 +399,6 @@ Return as structured JSON with clear sections and copy elements.
     def _reset_step(self):
         """Reset step 6 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_6_completed'] = False
+            self.state_manager.mark_step_incomplete(6)
+            st.session_state[REGENERATE_KEY] = True
             st.session_state.workflow_data['step_6_data'] = {}
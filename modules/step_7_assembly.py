@@ -6,18 +6,20 @@ from typing import Dict, Any, Optional
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+REGENERATE_KEY = 'step7_regenerate'  # Set by "Reassemble Landing Page" so the next run skips the response cache
+
 class AssemblyModule:
     """Step 7: Assembly & Consistency Checking"""
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing AssemblyModule: {str(e)}")
             self.ai_manager = None
@@ -147,13 +149,20 @@ class AssemblyModule:
             # Create assembly prompt
             assembly_prompt = self._create_assembly_prompt(config, all_steps_data)
 
+            # After "Reassemble", skip the cached reply and store the new one in its place
+            use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
+
             try:
-                response = self.ai_manager.generate_content(
+                stream = self.ai_manager.generate_content_stream(
                     prompt=assembly_prompt,
                     model=st.session_state.workflow_data['selected_model'],
                     temperature=0.3,
-                    max_tokens=2000
+                    max_tokens=2000,
+                    use_cache=use_cache,
+                    system_prompt=self.state_manager.get_shared_context()
                 )
+                st.write_stream(stream)
+                response = stream.result
 
                 if response.get('success', False):
                     # Create structured assembly data
@@ -539,5 +548,6 @@ Return structured analysis with specific recommendations and optimization sugges
     def _reset_step(self):
         """Reset step 7 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_7_completed'] = False
+            self.state_manager.mark_step_incomplete(7)
+            st.session_state[REGENERATE_KEY] = True
             st.session_state.workflow_data['step_7_data'] = {}
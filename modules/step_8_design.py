@@ -6,18 +6,20 @@ from typing import Dict, Any, Optional
 
 # Import with error handling
 try:
-    from ai_providers.ai_manager import AIManager
-    from utils.state_management import StateManager
+    from ai_providers.ai_manager import get_ai_manager
+    from utils.state_management import get_state_manager
 except ImportError as e:
     st.error(f"Module import error: {str(e)}")
 
+REGENERATE_KEY = 'step8_regenerate'  # Set by "Regenerate Design Specs" so the next run skips the response cache
+
 class DesignModule:
     """Step 8: Design & Technical Specifications"""
 
     def __init__(self):
         try:
-            self.ai_manager = AIManager()
-            self.state_manager = StateManager()
+            self.ai_manager = get_ai_manager()
+            self.state_manager = get_state_manager()
         except Exception as e:
             st.error(f"Error initializing DesignModule: {str(e)}")
             self.ai_manager = None
@@ -155,13 +157,20 @@ class DesignModule:
             # Create design specifications prompt
             design_prompt = self._create_design_prompt(config, all_steps_data)
 
+            # After "Regenerate", skip the cached reply and store the new one in its place
+            use_cache = False if st.session_state.pop(REGENERATE_KEY, False) else None
+
             try:
-                response = self.ai_manager.generate_content(
+                stream = self.ai_manager.generate_content_stream(
                     prompt=design_prompt,
                     model=st.session_state.workflow_data['selected_model'],
                     temperature=0.4,
-                    max_tokens=2500
+                    max_tokens=2500,
+                    use_cache=use_cache,
+                    system_prompt=self.state_manager.get_shared_context()
                 )
+                st.write_stream(stream)
+                response = stream.result
 
                 if response.get('success', False):
                     # Create structured design data
@@ -669,5 +678,6 @@ Return structured design specifications ready for implementation.
     def _reset_step(self):
         """Reset step 8 data"""
         if self.state_manager:
-            st.session_state.workflow_data['step_8_completed'] = False
+            self.state_manager.mark_step_incomplete(8)
+            st.session_state[REGENERATE_KEY] = True
             st.session_state.workflow_data['step_8_data'] = {}
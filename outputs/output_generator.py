@@ -189,11 +189,14 @@ class OutputGenerator:
         return doc_buffer
 
     def generate_complete_package(self, workflow_data: Dict[str, Any]) -> BytesIO:
-        """Generate complete ZIP package with all formats and assets"""
+        """Generate complete ZIP package with all formats and assets
+
+        Built in memory: st.download_button needs the whole archive as bytes anyway.
+        """
 
         zip_buffer = BytesIO()
 
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zip_file:
 
             # Add HTML file
             html_content = self.generate_html(workflow_data)
@@ -509,11 +512,11 @@ class OutputGenerator:
     # Helper methods for generating different sections
     def _generate_html_hero_section(self, step_3_data: Dict[str, Any]) -> str:
         """Generate hero section HTML"""
-        hero_data = step_3_data.get('ai_response', {})
+        hero_data = step_3_data.get('hero_copy', {})
 
         headline = hero_data.get('headline_primary', {}).get('copy', 'Your Headline Here')
-        subheadline = hero_data.get('subheadline_primary', {}).get('copy', 'Your compelling subheadline here')
-        cta_button = hero_data.get('cta_button_primary', {}).get('copy', 'Get Started Now')
+        subheadline = hero_data.get('headline_secondary', {}).get('copy', 'Your compelling subheadline here')
+        cta_button = hero_data.get('primary_cta', {}).get('button_text', 'Get Started Now')
 
         return f"""
     <section class="hero">
@@ -827,10 +830,10 @@ class OutputGenerator:
 
     def _generate_markdown_hero(self, step_3_data: Dict[str, Any]) -> str:
         """Generate hero section for markdown"""
-        hero_data = step_3_data.get('ai_response', {})
+        hero_data = step_3_data.get('hero_copy', {})
 
         headline = hero_data.get('headline_primary', {}).get('copy', 'N/A')
-        subheadline = hero_data.get('subheadline_primary', {}).get('copy', 'N/A')
+        subheadline = hero_data.get('headline_secondary', {}).get('copy', 'N/A')
 
         return f"""
 ### Primary Headline
@@ -840,7 +843,7 @@ class OutputGenerator:
 {subheadline}
 
 ### CTA Button
-{hero_data.get('cta_button_primary', {}).get('copy', 'Get Started Now')}
+{hero_data.get('primary_cta', {}).get('button_text', 'Get Started Now')}
 """
 
     def _generate_markdown_pas_copy(self, step_4_data: Dict[str, Any]) -> str:
@@ -944,13 +947,13 @@ Framework: Problem-Agitate-Solution V2.0 with Affiliate Marketing Best Practices
         """Add hero section to DOCX"""
         doc.add_heading('Hero Section', level=1)
 
-        hero_data = step_3_data.get('ai_response', {})
+        hero_data = step_3_data.get('hero_copy', {})
 
         doc.add_heading('Primary Headline', level=2)
         doc.add_paragraph(hero_data.get('headline_primary', {}).get('copy', 'N/A'))
 
         doc.add_heading('Subheadline', level=2)
-        doc.add_paragraph(hero_data.get('subheadline_primary', {}).get('copy', 'N/A'))
+        doc.add_paragraph(hero_data.get('headline_secondary', {}).get('copy', 'N/A'))
 
     def _add_docx_pas_section(self, doc, step_4_data: Dict[str, Any]):
         """Add PAS section to DOCX"""
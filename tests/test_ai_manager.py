@@ -0,0 +1,253 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("tenacity")
+
+from ai_providers import ai_manager
+from ai_providers.ai_manager import AIManager, DEFAULT_RATE_LIMITS, PROVIDER_LABELS
+from ai_providers.circuit_breaker import CircuitBreaker
+from ai_providers.key_pool import ClientPool
+from ai_providers.rate_limiter import TokenBucket
+from utils.llm_cache import LLMCache
+
+class APIStatusError(Exception):
+    """Stands in for an SDK error carrying an HTTP status"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+class FakeCompletions:
+    """Stands in for client.chat.completions.with_raw_response"""
+
+    def __init__(self):
+        self.calls = []
+        self.with_raw_response = self
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Hello"))],
+            usage=SimpleNamespace(total_tokens=12)
+        )
+        return SimpleNamespace(headers={"x-ratelimit-remaining-requests": "99"}, parse=lambda: response)
+
+def _manager_with_fake_openai():
+    """AIManager wired to a fake OpenAI client, skipping secrets-based setup"""
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    manager = AIManager.__new__(AIManager)
+    manager._generators = {'openai': manager._generate_openai}
+    manager.openai_available = True
+    manager.anthropic_available = False
+    manager.gemini_available = False
+    manager._openai_pool = ClientPool([client])
+    manager._buckets = {provider: TokenBucket(rpm=rpm, tpm=tpm) for provider, (rpm, tpm) in DEFAULT_RATE_LIMITS.items()}
+    manager._breakers = {provider: CircuitBreaker() for provider in PROVIDER_LABELS}
+    manager._warm_targets = []
+    manager._warm_lock = threading.Lock()
+    manager._warming = False
+    manager._last_request_at = time.monotonic()
+    return manager, completions
+
+def test_openai_generation_goes_through_throttle_and_client():
+    manager, completions = _manager_with_fake_openai()
+
+    result = manager._generate_uncached("Say hello", "gpt-4", 0.5, 100, system_prompt="Be brief")
+
+    assert result == {"content": "Hello", "model_used": "gpt-4", "tokens_used": 12, "success": True}
+    assert completions.calls[0]["messages"][0] == {"role": "system", "content": "Be brief"}
+    assert manager._breakers['openai'].current_state == "closed"
+    assert manager._openai_pool._remaining == [99]
+
+def test_stream_rejects_requests_over_the_context_window():
+    manager, completions = _manager_with_fake_openai()
+    manager.response_cache = SimpleNamespace(key=lambda *args: "key")
+
+    stream = manager.generate_content_stream("Say hello", "gpt-4", max_tokens=9000, use_cache=False, auto_route=False)
+
+    assert list(stream) == []
+    assert stream.result["success"] is False
+    assert "allows 8192" in stream.result["error"]
+    assert completions.calls == []
+
+def test_stream_failures_count_against_the_circuit_breaker():
+    manager, _ = _manager_with_fake_openai()
+    manager.response_cache = SimpleNamespace(key=lambda *args: "key")
+
+    def failing_stream(*args):
+        raise APIStatusError("overloaded", 503)
+        yield
+
+    manager._stream_openai = failing_stream
+    for _ in range(5):
+        stream = manager.generate_content_stream("Say hello", "gpt-4", max_tokens=100, use_cache=False)
+        assert list(stream) == []
+        assert stream.result == {"error": "OpenAI API error: overloaded", "success": False}
+
+    assert manager._breakers['openai'].current_state == "open"
+
+def test_bad_requests_do_not_trip_the_circuit_breaker():
+    manager, completions = _manager_with_fake_openai()
+    manager._generators['gemini'] = manager._generate_gemini
+    manager.gemini_available = True
+
+    def reject(**kwargs):
+        raise APIStatusError("invalid request", 400)
+
+    completions.create = reject
+    for _ in range(5):
+        result = manager._generate_uncached("Say hello", "gpt-4", 0.5, 100)
+        assert result == {"error": "OpenAI API error: invalid request", "success": False}
+
+    assert manager._breakers['openai'].current_state == "closed"
+    assert manager._resolve_provider('gpt-4') == ('openai', 'gpt-4')
+
+def test_connection_warming_stops_after_the_idle_window(monkeypatch):
+    manager, _ = _manager_with_fake_openai()
+    pings = []
+    monkeypatch.setattr(ai_manager, "_HTTP_CLIENT", SimpleNamespace(head=lambda url, **kwargs: pings.append(url)))
+    monkeypatch.setattr(ai_manager.threading, "Timer", lambda *args: pytest.fail("warm-up re-armed while idle"))
+    manager._warm_targets = [("https://api.openai.com/v1/models", {})]
+    manager._warming = True
+    manager._last_request_at = time.monotonic() - ai_manager.KEEPALIVE_IDLE_WINDOW_SECONDS - 1
+
+    manager._keep_connections_warm()
+
+    assert pings == ["https://api.openai.com/v1/models"]
+    assert manager._warming is False
+
+def test_throttle_counts_system_prompt_tokens():
+    manager, _ = _manager_with_fake_openai()
+    reserved = []
+    manager._buckets['openai'] = SimpleNamespace(acquire=lambda tokens: reserved.append(tokens))
+
+    manager._throttle('openai', "Say hello", 100)
+    manager._throttle('openai', "Say hello", 100, system_prompt="Product context " * 50)
+
+    assert reserved[1] > reserved[0] + 50
+
+def test_rate_limit_settings_are_clamped_to_at_least_one():
+    manager, _ = _manager_with_fake_openai()
+    settings = {"OPENAI_RPM": "0", "OPENAI_TPM": -5, "ANTHROPIC_RPM": "not a number"}
+    manager._get_setting = settings.get
+
+    buckets = manager._build_rate_limiters()
+
+    assert (buckets['openai'].rpm, buckets['openai'].tpm) == (1, 1)
+    assert buckets['anthropic'].rpm == DEFAULT_RATE_LIMITS['anthropic'][0]
+    buckets['openai'].acquire(tokens=0)
+
+def _manager_with_counting_stream(tmp_path):
+    """Manager whose OpenAI stream returns a new reply on every call"""
+    manager, _ = _manager_with_fake_openai()
+    manager.response_cache = LLMCache(directory=str(tmp_path))
+    replies = iter(f"Reply {n}" for n in range(1, 10))
+
+    def stream(*args):
+        yield next(replies)
+
+    manager._stream_openai = stream
+    return manager
+
+def _streamed(manager, **kwargs):
+    stream = manager.generate_content_stream("Write a headline", "gpt-4", max_tokens=100, auto_route=False, **kwargs)
+    return "".join(stream)
+
+def test_sampled_requests_are_not_cached_by_default(tmp_path):
+    manager = _manager_with_counting_stream(tmp_path)
+
+    assert _streamed(manager, temperature=0.8) == "Reply 1"
+    assert _streamed(manager, temperature=0.8) == "Reply 2"
+    assert _streamed(manager, temperature=0) == "Reply 3"
+    assert _streamed(manager, temperature=0) == "Reply 3"
+
+def test_regenerate_replaces_the_cached_response(tmp_path):
+    manager = _manager_with_counting_stream(tmp_path)
+
+    assert _streamed(manager, temperature=0.8, use_cache=True) == "Reply 1"
+    assert _streamed(manager, temperature=0.8, use_cache=True) == "Reply 1"
+    assert _streamed(manager, temperature=0.8, use_cache=False) == "Reply 2"
+    assert _streamed(manager, temperature=0.8, use_cache=True) == "Reply 2"
+
+def test_json_prefers_the_object_over_an_earlier_bracket():
+    parsed = AIManager.validate_json_response('Here [1]: {"a": 1} and [2]')
+
+    assert parsed == {"valid": True, "data": {"a": 1}}
+
+def test_json_keeps_an_array_of_objects_whole():
+    content = 'Variants:\n[{"headline": "One"}, {"headline": "Two"}]\nEnjoy!'
+
+    assert AIManager.validate_json_response(content)["data"] == [{"headline": "One"}, {"headline": "Two"}]
+    assert AIManager.validate_json_response(content, expected_type=list)["data"] == [
+        {"headline": "One"}, {"headline": "Two"}
+    ]
+
+def test_json_uses_the_expected_type_when_several_spans_parse():
+    content = 'Notes {"draft": true} then [{"headline": "One"}]'
+
+    assert AIManager.validate_json_response(content)["data"] == {"draft": True}
+    assert AIManager.validate_json_response(content, expected_type=list)["data"] == [{"headline": "One"}]
+
+def test_json_parses_a_fenced_block():
+    content = 'Sure!\n```json\n{"a": [1, 2]}\n```\nLet me know.'
+
+    assert AIManager.validate_json_response(content)["data"] == {"a": [1, 2]}
+
+@pytest.mark.parametrize("json5_available", [True, False])
+def test_json_falls_back_to_lenient_parsing(monkeypatch, json5_available):
+    if json5_available:
+        pytest.importorskip("json5")
+    monkeypatch.setattr(ai_manager, "JSON5_AVAILABLE", json5_available)
+
+    parsed = AIManager.validate_json_response('See [1]. {"a": 1, "b": [2, 3,],}')
+
+    assert parsed == {"valid": True, "data": {"a": 1, "b": [2, 3]}}
+
+def test_json_reports_missing_payload():
+    assert AIManager.validate_json_response("") == {"valid": False, "error": "Response is empty"}
+    assert AIManager.validate_json_response("No JSON here")["valid"] is False
+
+def test_identical_concurrent_requests_share_one_provider_call(tmp_path):
+    manager, completions = _manager_with_fake_openai()
+    manager.response_cache = LLMCache(directory=str(tmp_path))
+    manager.semantic_cache = None
+    manager._inflight = {}
+    manager._inflight_lock = threading.Lock()
+    release = threading.Event()
+    create = completions.create
+
+    def slow_create(**kwargs):
+        release.wait(timeout=5)
+        return create(**kwargs)
+
+    completions.create = slow_create
+    results = []
+
+    def request():
+        results.append(manager._generate_cached("Say hello", "gpt-4", 0, 100, use_cache=None))
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while len(manager._inflight) == 0:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(completions.calls) == 1
+    assert [result["content"] for result in results] == ["Hello"] * 3
+
+def test_only_prompts_above_the_provider_minimum_are_marked_cacheable():
+    short = ai_manager._anthropic_system("Be brief")["system"][0]
+    long = ai_manager._anthropic_system("Be brief. " * 1000)["system"][0]
+
+    assert "cache_control" not in short
+    assert long["cache_control"] == {"type": "ephemeral"}
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from ai_providers.circuit_breaker import CircuitBreaker
+
+def test_opens_after_fail_max_consecutive_failures():
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=60)
+    breaker.record_failure()
+
+    assert breaker.allows_requests()
+    breaker.record_failure()
+    assert breaker.current_state == "open"
+    assert not breaker.allows_requests()
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.current_state == "closed"
+
+def test_half_open_trial_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.current_state == "half_open"
+    breaker.record_success()
+    assert breaker.current_state == "closed"
+
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.record_failure()
+    assert breaker.current_state == "open"
+
+def test_half_open_lets_exactly_one_trial_through():
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    allowed = []
+    threads = [threading.Thread(target=lambda: allowed.append(breaker.allows_requests())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(allowed) == [False, False, False, False, True]
+
+def test_released_trial_can_be_taken_again():
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allows_requests()
+    assert not breaker.allows_requests()
+    breaker.release_trial()
+    assert breaker.allows_requests()
+
+def test_unreported_trial_expires_after_another_cooldown():
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=0.02)
+    breaker.record_failure()
+    time.sleep(0.03)
+
+    assert breaker.allows_requests()
+    time.sleep(0.03)
+    assert breaker.allows_requests()
@@ -0,0 +1,19 @@
+from ai_providers.key_pool import ClientPool
+
+def test_acquire_round_robins_over_unreported_keys():
+    pool = ClientPool(['k1', 'k2'])
+
+    assert [pool.acquire()[1] for _ in range(3)] == ['k1', 'k2', 'k1']
+
+def test_acquire_skips_keys_below_low_watermark():
+    pool = ClientPool(['k1', 'k2'], low_watermark=5)
+    pool.report(0, {'x-ratelimit-remaining-requests': '2'})
+
+    assert [pool.acquire()[1] for _ in range(2)] == ['k2', 'k2']
+
+def test_acquire_falls_back_to_key_with_most_quota():
+    pool = ClientPool(['k1', 'k2'], low_watermark=5)
+    pool.report(0, {'x-ratelimit-remaining-requests': '3'})
+    pool.report(1, {'anthropic-ratelimit-requests-remaining': '1'})
+
+    assert pool.acquire()[1] == 'k1'
@@ -0,0 +1,102 @@
+import pytest
+
+pytest.importorskip("streamlit")
+np = pytest.importorskip("numpy")
+
+from utils import llm_cache
+from utils.llm_cache import LLMCache, SemanticCache
+
+@pytest.fixture
+def semantic_cache(monkeypatch):
+    """In-memory semantic cache on the numpy backend"""
+    monkeypatch.setattr(llm_cache, "FAISS_AVAILABLE", False)
+    return SemanticCache(directory=None)
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    """Response cache with only the in-process tier"""
+    monkeypatch.setattr(llm_cache, "DISKCACHE_AVAILABLE", False)
+    return LLMCache(max_entries=2)
+
+def _vector(*values):
+    vector = np.array([values], dtype='float32')
+    return vector / np.linalg.norm(vector)
+
+def test_semantic_lookup_requires_the_same_request_settings(semantic_cache):
+    prompt = 'Write a headline for "Acme Blender"'
+    semantic_cache.add(_vector(1, 0), prompt, {"content": "Blend faster", "model_used": "gpt-4"},
+                       "gpt-4", 0.7, 500, system_prompt="Audience: busy parents")
+
+    assert semantic_cache.lookup(_vector(1, 0), prompt, "gpt-4", 0.7, 500, "Audience: athletes") is None
+    assert semantic_cache.lookup(_vector(1, 0), prompt, "gpt-4", 0.2, 500, "Audience: busy parents") is None
+    assert semantic_cache.lookup(_vector(1, 0), prompt, "gpt-4", 0.7, 900, "Audience: busy parents") is None
+
+    cached = semantic_cache.lookup(_vector(1, 0), prompt, "gpt-4", 0.7, 500, "Audience: busy parents")
+    assert cached["content"] == "Blend faster"
+    assert cached["model_used"] == "gpt-4 (cached)"
+
+def test_key_covers_every_request_setting():
+    key = LLMCache.key("Hi", "gpt-4", 0, 100)
+
+    assert key == LLMCache.key("Hi", "gpt-4", 0, 100)
+    assert key != LLMCache.key("Hi", "gpt-4", 0, 200)
+    assert key != LLMCache.key("Hi", "gpt-4", 0, 100, system_prompt="Be brief")
+    assert key != LLMCache.key("Hi", "gpt-4", 0, 100, json_mode=True)
+
+def test_get_flags_hits_without_touching_the_stored_response(memory_cache):
+    memory_cache.set("k", {"content": "Hello"})
+
+    assert memory_cache.get("k") == {"content": "Hello", "cache_hit": True}
+    assert "cache_hit" not in memory_cache._memory["k"][1]
+    assert memory_cache.get("missing") is None
+
+def test_least_recently_used_entry_is_evicted(memory_cache):
+    memory_cache.set("a", {"content": "A"})
+    memory_cache.set("b", {"content": "B"})
+    memory_cache.get("a")
+    memory_cache.set("c", {"content": "C"})
+
+    assert memory_cache.get("b") is None
+    assert memory_cache.get("a")["content"] == "A"
+
+def test_expired_entries_are_dropped(memory_cache):
+    memory_cache.ttl_seconds = 0
+    memory_cache.set("k", {"content": "Hello"})
+
+    assert memory_cache.get("k") is None
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    pytest.importorskip("diskcache")
+    LLMCache(directory=str(tmp_path)).set("k", {"content": "Hello"})
+
+    restored = LLMCache(directory=str(tmp_path))
+
+    assert restored.backend == "disk"
+    assert restored.get("k")["content"] == "Hello"
+
+def test_semantic_lookup_never_serves_another_products_response(semantic_cache):
+    semantic_cache.add(_vector(1, 0), 'Write a headline for "Acme Blender"', {"content": "Blend faster"},
+                       "gpt-4", 0.7, 500)
+
+    identical = _vector(1, 0)
+    assert semantic_cache.lookup(identical, 'Write a headline for "Zest Juicer"', "gpt-4", 0.7, 500) is None
+    assert semantic_cache.lookup(identical, 'Write a headline for "Acme Blender" 2', "gpt-4", 0.7, 500) is None
+
+def test_semantic_lookup_tolerates_rewording_of_the_same_product(semantic_cache):
+    semantic_cache.add(_vector(1, 0), 'Write a headline for "Acme Blender"', {"content": "Blend faster"},
+                       "gpt-4", 0.7, 500)
+
+    similar = _vector(0.95, 0.31)
+    cached = semantic_cache.lookup(similar, 'Write a headline for "Acme Blender" please', "gpt-4", 0.7, 500)
+    assert cached["content"] == "Blend faster"
+    assert semantic_cache.lookup(_vector(0, 1), 'Write a headline for "Acme Blender"', "gpt-4", 0.7, 500) is None
+
+def test_semantic_cache_persists_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "FAISS_AVAILABLE", False)
+    prompt = 'Write a headline for "Acme Blender"'
+    SemanticCache(directory=str(tmp_path)).add(_vector(1, 0), prompt, {"content": "Blend faster"},
+                                               "gpt-4", 0.7, 500)
+
+    restored = SemanticCache(directory=str(tmp_path))
+
+    assert restored.lookup(_vector(1, 0), prompt, "gpt-4", 0.7, 500)["content"] == "Blend faster"
@@ -0,0 +1,25 @@
+from ai_providers.rate_limiter import TokenBucket
+
+def test_requests_within_the_quota_do_not_wait():
+    bucket = TokenBucket(rpm=3)
+
+    assert [bucket._reserve(0) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+def test_request_over_the_quota_waits_for_a_refill():
+    bucket = TokenBucket(rpm=60)
+    for _ in range(60):
+        bucket._reserve(0)
+
+    assert 0.9 < bucket._reserve(0) <= 1.0
+
+def test_token_deficit_sets_the_wait():
+    bucket = TokenBucket(rpm=100, tpm=600)
+    bucket._reserve(600)
+
+    assert 29 < bucket._reserve(300) <= 30
+
+def test_oversized_request_is_capped_at_one_minute_of_tokens():
+    bucket = TokenBucket(rpm=100, tpm=600)
+
+    assert bucket._reserve(10_000) == 0.0
+    assert 0 < bucket._reserve(1) <= 0.1
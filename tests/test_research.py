@@ -0,0 +1,39 @@
+import json
+import re
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("tenacity")
+
+from ai_providers.ai_manager import PROMPT_CACHE_MIN_TOKENS, _count_tokens
+from modules.step_1_research import RESEARCH_SYSTEM_PROMPT, ProductResearchModule, _RESEARCH_SCHEMA
+
+def _shape(schema):
+    """Nested keys of a schema or example, with leaves reduced to 'list' or 'text'"""
+    return {key: _shape(value) if isinstance(value, dict) else ("list" if isinstance(value, (list, tuple)) else "text")
+            for key, value in schema.items()}
+
+def test_system_prompt_spells_out_the_research_schema():
+    example = json.loads(re.search(r"^\{.*^\}", RESEARCH_SYSTEM_PROMPT, re.M | re.S).group(0))
+
+    assert _shape(example) == _shape(_RESEARCH_SCHEMA)
+
+def test_missing_fields_are_flagged_not_backfilled():
+    module = ProductResearchModule.__new__(ProductResearchModule)
+
+    research = module._create_research_structure({}, {
+        "product_analysis": {"features": ["Quiet motor"], "product_positioning": "Blender for small kitchens"},
+        "audience_intelligence": {"pain_points": "Loud appliances"}
+    })
+
+    assert research["product_analysis"]["key_features"] == []
+    assert research["product_analysis"]["product_positioning"] == "Blender for small kitchens"
+    assert research["audience_intelligence"]["pain_points"] == ["Loud appliances"]
+    assert "product_analysis.key_features" in research["missing_fields"]
+    assert "audience_intelligence.demographics.age_range" in research["missing_fields"]
+    assert "audience_intelligence.pain_points" not in research["missing_fields"]
+    assert "supplement" not in json.dumps(research)
+
+def test_system_prompt_is_long_enough_for_provider_caching():
+    assert _count_tokens(RESEARCH_SYSTEM_PROMPT) >= PROMPT_CACHE_MIN_TOKENS
@@ -0,0 +1,28 @@
+import pytest
+
+st = pytest.importorskip("streamlit")
+pytest.importorskip("tenacity")
+
+from ai_providers.ai_manager import PROMPT_CACHE_MIN_TOKENS, _count_tokens
+from utils.state_management import StateManager
+
+@pytest.fixture
+def state_manager():
+    manager = StateManager()
+    st.session_state.workflow_data = manager._new_workflow_data()
+    yield manager
+    del st.session_state.workflow_data
+
+def test_shared_context_waits_for_research(state_manager):
+    assert state_manager.get_shared_context() is None
+
+def test_shared_context_carries_the_research_and_clears_the_cache_minimum(state_manager):
+    state_manager.save_step_data(1, {
+        'form_inputs': {'product_name': 'Acme Blender', 'target_audience': 'Busy parents'},
+        'research_insights': {'product_analysis': {'key_features': ['Quiet motor']}}
+    })
+
+    context = state_manager.get_shared_context()
+
+    assert '"Quiet motor"' in context
+    assert _count_tokens(context) >= PROMPT_CACHE_MIN_TOKENS
@@ -0,0 +1,308 @@
+import streamlit as st
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from utils import serialization
+
+# Optional shared/persistent backends
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# Semantic cache dependencies are heavy, so only probe for them here and
+# import them on first use
+SEMANTIC_CACHE_AVAILABLE = (
+    importlib.util.find_spec("sentence_transformers") is not None
+    and importlib.util.find_spec("numpy") is not None
+)
+FAISS_AVAILABLE = importlib.util.find_spec("faiss") is not None
+
+CACHE_TTL_SECONDS = 3600
+PERSISTENT_TTL_SECONDS = 86400
+CACHE_MAX_ENTRIES = 512
+CACHE_DIRECTORY = ".llm_cache"
+SEMANTIC_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "semantic")
+
+class LLMCache:
+    """Exact-match response cache: an in-process LRU in front of Redis or an on-disk store
+
+    Redis is used when a URL is configured and reachable so every worker shares
+    hits; otherwise diskcache keeps responses across app restarts. Without
+    either, only the in-process tier is used.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, directory: str = CACHE_DIRECTORY,
+                 ttl_seconds: int = CACHE_TTL_SECONDS, persistent_ttl_seconds: int = PERSISTENT_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.persistent_ttl_seconds = persistent_ttl_seconds
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._disk = None
+        self.backend = "memory"
+        self.backend_error = None
+
+        if redis_url and REDIS_AVAILABLE:
+            try:
+                client = redis.Redis.from_url(redis_url, socket_timeout=2)
+                client.ping()
+                self._redis = client
+                self.backend = "redis"
+                return
+            except Exception as e:
+                self.backend_error = str(e)
+
+        if DISKCACHE_AVAILABLE:
+            try:
+                self._disk = diskcache.Cache(directory)
+                self.backend = "disk"
+            except Exception as e:
+                self.backend_error = str(e)
+
+    @staticmethod
+    def key(prompt: str, model: str, temperature: float, max_tokens: int,
+            system_prompt: Optional[str] = None, json_mode: bool = False) -> str:
+        """Build a stable cache key for a generation request"""
+        request = {"m": model, "p": prompt, "t": temperature, "mx": max_tokens}
+        if system_prompt:
+            request["s"] = system_prompt
+        if json_mode:
+            request["j"] = True
+        payload = serialization.dumps(request, sort_keys=True)
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response flagged with cache_hit, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+
+        result = entry[1] if entry is not None else self._get_persistent(key)
+        if result is None:
+            return None
+
+        cached = dict(result)
+        cached["cache_hit"] = True
+        return cached
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """Store a successful response in every available tier"""
+        self._set_memory(key, result)
+        try:
+            if self._redis is not None:
+                self._redis.setex(f"llm:{key}", self.persistent_ttl_seconds, serialization.dumps(result))
+            elif self._disk is not None:
+                self._disk.set(key, result, expire=self.persistent_ttl_seconds)
+        except Exception:
+            pass
+
+    def _get_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up Redis or disk and promote a hit into memory"""
+        try:
+            if self._redis is not None:
+                raw = self._redis.get(f"llm:{key}")
+                result = serialization.loads(raw) if raw else None
+            elif self._disk is not None:
+                result = self._disk.get(key)
+            else:
+                return None
+        except Exception:
+            return None
+
+        if result is not None:
+            self._set_memory(key, result)
+        return result
+
+    def _set_memory(self, key: str, result: Dict[str, Any]):
+        """Store in the in-process tier, evicting the least recently used entries"""
+        with self._lock:
+            self._memory[key] = (time.time(), dict(result))
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+@st.cache_resource(show_spinner=False)
+def get_llm_cache(redis_url: Optional[str] = None) -> LLMCache:
+    """Return the process-wide response cache"""
+    return LLMCache(redis_url=redis_url)
+
+@st.cache_resource(show_spinner=False)
+def _load_embedding_model(model_name: str):
+    """Load the sentence-transformers model once per process"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+# Product names, quoted values, numbers and URLs are the product-specific slots of a
+# template prompt; a near-duplicate may only be reused when every slot value is the same
+_SLOT_PATTERN = re.compile(r'https?://\S+|"[^"]*"|\d+(?:[.,]\d+)*|\b[A-Z][\w\'-]*(?:[ \t]+[A-Z][\w\'-]*)*')
+
+class SemanticCache:
+    """Returns cached responses for prompts whose embeddings are near-duplicates
+
+    A hit needs similarity_threshold and exactly the same slot values (names,
+    numbers, URLs, quoted text), so rewording is tolerated but a prompt about a
+    different product never reuses another product's copy. Only entries for the
+    same model, temperature, max_tokens and system prompt are considered. Entries are persisted under directory so they survive restarts.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", similarity_threshold: float = 0.92,
+                 ttl_seconds: int = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES, directory: Optional[str] = SEMANTIC_CACHE_DIRECTORY):
+        self.model_name = model_name
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        """Drop all cached vectors and responses"""
+        self._index = None
+        self._vectors = []
+        self._entries = []  # (stored_at, scope, slots, response) parallel to the index
+
+    @staticmethod
+    def slots(prompt: str) -> str:
+        """Return the prompt's product-specific values, in order, as one comparable string"""
+        return "\x1f".join(_SLOT_PATTERN.findall(prompt))
+
+    @staticmethod
+    def scope(model: str, temperature: float, max_tokens: int, system_prompt: Optional[str] = None) -> str:
+        """Key for the request settings besides the prompt that an entry must share to be reused"""
+        return LLMCache.key("", model, temperature, max_tokens, system_prompt)
+
+    def embed(self, prompt: str):
+        """Return the normalized embedding for a prompt as a (1, dim) float32 array"""
+        model = _load_embedding_model(self.model_name)
+        return model.encode([prompt], normalize_embeddings=True).astype('float32')
+
+    def lookup(self, vector, prompt: str, model: str, temperature: float, max_tokens: int,
+               system_prompt: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Find the closest fresh entry with the same request settings and slot values above the threshold"""
+        import numpy as np
+
+        scope = self.scope(model, temperature, max_tokens, system_prompt)
+        slots = self.slots(prompt)
+        with self._lock:
+            if not self._entries:
+                return None
+
+            k = min(5, len(self._entries))
+            if self._index is not None:
+                scores, ids = self._index.search(vector, k)
+                candidates = zip(scores[0], ids[0])
+            else:
+                similarities = np.vstack(self._vectors) @ vector[0]
+                top = np.argsort(-similarities)[:k]
+                candidates = ((similarities[i], i) for i in top)
+
+            now = time.time()
+            for score, idx in candidates:
+                if idx < 0 or score < self.similarity_threshold:
+                    break
+                stored_at, entry_scope, entry_slots, response = self._entries[idx]
+                if entry_scope != scope or entry_slots != slots or now - stored_at > self.ttl_seconds:
+                    continue
+                cached = dict(response)
+                cached["model_used"] = f"{response.get('model_used', model)} (cached)"
+                cached["cache_hit"] = True
+                cached["semantic_similarity"] = float(score)
+                return cached
+
+        return None
+
+    def add(self, vector, prompt: str, response: Dict[str, Any], model: str, temperature: float,
+            max_tokens: int, system_prompt: Optional[str] = None):
+        """Store a response under its prompt embedding and persist the cache"""
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._reset()
+
+            self._append_vector(vector)
+            scope = self.scope(model, temperature, max_tokens, system_prompt)
+            self._entries.append((time.time(), scope, self.slots(prompt), dict(response)))
+            self._save()
+
+    def _append_vector(self, vector):
+        """Add a (1, dim) vector to the FAISS index or the numpy fallback list"""
+        if FAISS_AVAILABLE:
+            if self._index is None:
+                import faiss
+                self._index = faiss.IndexFlatIP(vector.shape[1])
+            self._index.add(vector)
+        else:
+            self._vectors.append(vector[0])
+
+    def _save(self):
+        """Write vectors and entries to disk; failures only cost persistence"""
+        if not self.directory:
+            return
+        try:
+            import numpy as np
+
+            os.makedirs(self.directory, exist_ok=True)
+            if self._index is not None:
+                import faiss
+                faiss.write_index(self._index, os.path.join(self.directory, "index.faiss"))
+            else:
+                np.save(os.path.join(self.directory, "vectors.npy"), np.vstack(self._vectors))
+            with open(os.path.join(self.directory, "entries.json"), "wb") as f:
+                f.write(serialization.dumps(self._entries))
+        except Exception:
+            pass
+
+    def _load(self):
+        """Restore a previously saved cache, starting empty if it is missing or unreadable"""
+        if not self.directory:
+            return
+        entries_path = os.path.join(self.directory, "entries.json")
+        if not os.path.exists(entries_path):
+            return
+        try:
+            import numpy as np
+
+            with open(entries_path, "rb") as f:
+                entries = [tuple(entry) for entry in serialization.loads(f.read())]
+
+            index_path = os.path.join(self.directory, "index.faiss")
+            if FAISS_AVAILABLE and os.path.exists(index_path):
+                import faiss
+                self._index = faiss.read_index(index_path)
+                if self._index.ntotal != len(entries):
+                    raise ValueError("semantic cache index and entries are out of sync")
+            else:
+                vectors = np.load(os.path.join(self.directory, "vectors.npy"))
+                if len(vectors) != len(entries):
+                    raise ValueError("semantic cache vectors and entries are out of sync")
+                for vector in vectors:
+                    self._append_vector(vector[None, :].astype('float32'))
+            self._entries = entries
+        except Exception:
+            self._reset()
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache"""
+    return SemanticCache()
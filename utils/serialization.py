@@ -0,0 +1,31 @@
+import json
+from typing import Any, Union
+
+# orjson is several times faster than the stdlib encoder and returns bytes directly
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes; non-JSON types (datetime, ...) become strings"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option)
+
+    # Compact separators match orjson so cache keys agree with or without it
+    return json.dumps(
+        obj, sort_keys=sort_keys, indent=2 if indent else None, separators=None if indent else (',', ':'),
+        default=str, ensure_ascii=False
+    ).encode('utf-8')
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Parse JSON from bytes or str"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
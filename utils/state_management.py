@@ -1,7 +1,104 @@
 import streamlit as st
+import copy
 from datetime import datetime
-import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+from utils import serialization
+
+# Stable instructions shared by every generation step; kept first in the shared
+# context so provider prompt caching sees an identical prefix on each call. Together
+# with the research below it keeps the prefix above the providers' 1024-token minimum.
+FRAMEWORK_RULES = """You are an expert direct-response copywriter building a PPC affiliate landing page.
+Every step of this workflow writes one part of the same page, so each answer must fit the
+product research, terminology and offer details given below.
+
+## Page Framework: Problem-Agitate-Solution
+- Problem: name the specific problem the target audience has, in the words they would use
+  when describing it to a friend. Open with the problem the research ranks highest.
+- Agitate: show what the problem costs them today and what happens if nothing changes.
+  Use concrete, everyday consequences rather than exaggerated or fear-based claims.
+- Solution: introduce the product as the answer to that problem. Tie each feature to the
+  benefit it delivers and to the pain point it removes.
+- Proof: support the solution with the trust elements and social proof opportunities the
+  research lists. Only use proof that exists; describe a placeholder where it is missing.
+- Action: close with one clear call to action and the reason to act now.
+
+## Voice and Style
+- Write for the target audience described below, in their own language and at a grade 6-8
+  reading level. Prefer short sentences, active voice and second person ("you").
+- Keep every claim specific to the product; never fall back to generic templates or copy
+  written for another product category.
+- Lead with benefits, then support them with features. One idea per sentence, one promise
+  per headline.
+- Avoid jargon, filler adjectives and clichés such as "revolutionary", "game-changing" or
+  "one-of-a-kind" unless the research supports them with a concrete fact.
+- Keep the tone consistent across sections: the same level of formality, the same name
+  for the product and the same words for its key features and benefits.
+
+## Affiliate and Compliance Rules
+- This is an affiliate page: the reader clicks through to the merchant to buy. Never
+  imply that the page owner makes, ships or services the product.
+- No guaranteed results, no cure or treatment claims, no income claims, and no
+  before/after promises that the merchant cannot substantiate.
+- Never fabricate statistics, studies, reviews, testimonials, endorsements, awards or
+  media mentions. Where real proof is needed but not provided, write a clearly marked
+  placeholder such as [Customer testimonial] for the page owner to fill in.
+- Prices, discounts, guarantees and deadlines must match the offer details given. Do not
+  invent scarcity or countdowns; describe urgency only in terms of the real offer.
+- Keep an affiliate disclosure in mind: copy must stay truthful when read next to a
+  statement that the page owner earns a commission.
+
+## Conversion Guidelines
+- Every section should move the reader toward the call to action and answer the question
+  the reader is most likely to have at that point on the page.
+- Address the objections listed in the research directly and early; do not leave the
+  strongest objection for the final section.
+- Calls to action start with a verb, describe what the reader gets, and stay consistent
+  in wording across the page (3-5 words for buttons).
+- Write for mobile first: short paragraphs of one to three sentences, scannable bullet
+  lists, and headlines that still make sense when they wrap onto two lines.
+- Use the audience's motivations and emotional triggers from the research, but keep the
+  emphasis on practical outcomes the product can actually deliver.
+
+## Working With the Research
+- The product research below is the single source of facts for this page. Use its key
+  features, unique selling propositions and positioning to decide what the page says
+  first, and its pain points, motivations and buying triggers to decide how it says it.
+- Quote market size, pricing and competitor details only as the research states them;
+  do not round numbers up, merge sources or add figures of your own.
+- When the research and the target audience description disagree, follow the target
+  audience description and keep the copy specific to that reader.
+- Competitor comparisons must be fair and verifiable: compare on the competitive
+  advantages the research lists and never name a competitor in a disparaging way.
+
+## Terminology and Consistency
+- Use the product name exactly as given, with the same spelling and capitalization, in
+  every section. Do not shorten it or invent nicknames.
+- Once a feature, benefit or offer element has a name, keep using that name; a reader
+  who sees two names assumes they are two different things.
+- Keep the same price, guarantee length, shipping terms and bonuses everywhere they are
+  mentioned. If earlier steps established wording for them, reuse that wording.
+- Headline promises must be delivered by the body copy that follows them, and the final
+  call to action must match the offer described in the hero section.
+
+## Output Rules
+- Follow the output format the step asks for exactly. When JSON is requested, return only
+  valid JSON with the requested keys and no commentary before or after it.
+- Do not repeat these instructions or the research back in the answer.
+- If the research marks a field as not found, do not invent it; write around the gap or
+  use a clearly marked placeholder."""
+
+def migrate_completion_flags(workflow_data: Dict[str, Any]):
+    """Fold the per-step completed flags of older sessions and project files into completion_mask
+
+    The bitmask (bit n-1 for step n) is the only completion record; the legacy
+    step_N_completed keys are dropped so they cannot drift from it.
+    """
+    mask = 0
+    for step in range(1, 9):
+        if workflow_data.pop(f'step_{step}_completed', False):
+            mask |= 1 << (step - 1)
+    workflow_data.setdefault('completion_mask', mask)
 
 class StateManager:
     """Manages application state across workflow steps"""
@@ -11,18 +108,11 @@ class StateManager:
             'project_name': '',
             'selected_model': 'gemini-1.5-pro',  # Changed to most accessible default
             'current_step': 1,
-            'created_at': datetime.now().isoformat(),
-            'last_updated': datetime.now().isoformat(),
+            'created_at': '',  # Stamped per session by _new_workflow_data
+            'last_updated': '',
 
             # Step completion status
-            'step_1_completed': False,
-            'step_2_completed': False,
-            'step_3_completed': False,
-            'step_4_completed': False,
-            'step_5_completed': False,
-            'step_6_completed': False,
-            'step_7_completed': False,
-            'step_8_completed': False,
+            'completion_mask': 0,  # Bit n-1 set when step n is completed; the single record of completion
 
             # Step data storage
             'step_1_data': {},  # Product research
@@ -45,40 +135,63 @@ class StateManager:
             }
         }
 
+    def _new_workflow_data(self) -> Dict[str, Any]:
+        """Fresh workflow data for a session; deep-copied so sessions never share nested dicts"""
+        workflow_data = copy.deepcopy(self.default_workflow_data)
+        workflow_data['created_at'] = workflow_data['last_updated'] = datetime.now().isoformat()
+        return workflow_data
+
     def initialize_session_state(self):
         """Initialize session state with default values if not already set"""
         try:
             if 'workflow_data' not in st.session_state:
-                st.session_state.workflow_data = self.default_workflow_data.copy()
+                st.session_state.workflow_data = self._new_workflow_data()
+
+            workflow_data = st.session_state.workflow_data
+
+            # Sessions from before the bitmask existed derive it from the per-step flags
+            migrate_completion_flags(workflow_data)
 
             # Ensure all required keys exist (for backwards compatibility)
             for key, value in self.default_workflow_data.items():
-                if key not in st.session_state.workflow_data:
-                    st.session_state.workflow_data[key] = value
+                if key not in workflow_data:
+                    workflow_data[key] = copy.deepcopy(value)
 
         except Exception as e:
             st.error(f"Error initializing session state: {str(e)}")
-            st.session_state.workflow_data = self.default_workflow_data.copy()
+            st.session_state.workflow_data = self._new_workflow_data()
 
     def mark_step_completed(self, step_number: int):
         """Mark a specific step as completed"""
         try:
             if 1 <= step_number <= 8:
-                st.session_state.workflow_data[f'step_{step_number}_completed'] = True
-                st.session_state.workflow_data['last_updated'] = datetime.now().isoformat()
+                workflow_data = st.session_state.workflow_data
+                workflow_data['completion_mask'] |= 1 << (step_number - 1)
+                workflow_data['last_updated'] = datetime.now().isoformat()
 
                 # Auto-advance to next step if not at the end
                 if step_number < 8:
-                    st.session_state.workflow_data['current_step'] = step_number + 1
+                    workflow_data['current_step'] = step_number + 1
         except Exception as e:
             st.error(f"Error marking step {step_number} as completed: {str(e)}")
 
+    def mark_step_incomplete(self, step_number: int):
+        """Clear the completed flag for a specific step"""
+        try:
+            if 1 <= step_number <= 8:
+                workflow_data = st.session_state.workflow_data
+                workflow_data['completion_mask'] &= ~(1 << (step_number - 1))
+        except Exception as e:
+            st.error(f"Error marking step {step_number} as incomplete: {str(e)}")
+
     def save_step_data(self, step_number: int, data: Dict[str, Any]):
         """Save data for a specific step"""
         try:
             if 1 <= step_number <= 8:
-                st.session_state.workflow_data[f'step_{step_number}_data'] = data
-                st.session_state.workflow_data['last_updated'] = datetime.now().isoformat()
+                st.session_state.workflow_data.update({
+                    f'step_{step_number}_data': data,
+                    'last_updated': datetime.now().isoformat()
+                })
         except Exception as e:
             st.error(f"Error saving data for step {step_number}: {str(e)}")
 
@@ -91,11 +204,46 @@ class StateManager:
             st.error(f"Error retrieving data for step {step_number}: {str(e)}")
         return {}
 
+    def get_shared_context(self) -> Optional[str]:
+        """Project, product and research context shared by every step after research, or None before Step 1
+
+        Everything here is fixed once Step 1 completes, so the text is byte-identical
+        across steps and provider prompt caching can reuse it.
+        """
+        step_1_data = self.get_step_data(1)
+        form_inputs = step_1_data.get('form_inputs', {})
+        if not form_inputs:
+            return None
+
+        research = serialization.dumps(step_1_data.get('research_insights') or {}, sort_keys=True, indent=True)
+        return (
+            f"{FRAMEWORK_RULES}\n\n"
+            f"## Project\n{st.session_state.workflow_data.get('project_name', '') or 'Untitled'}\n\n"
+            f"## Product\n"
+            f"- Name: {form_inputs.get('product_name', '')}\n"
+            f"- Category: {form_inputs.get('product_category', '')}\n"
+            f"- Price Range: {form_inputs.get('price_range', '')}\n"
+            f"- URL: {form_inputs.get('target_url', '') or 'Not provided'}\n\n"
+            f"## Target Audience\n{form_inputs.get('target_audience', '')}\n\n"
+            f"## Product Research\n{research.decode('utf-8')}"
+        )
+
+    def get_step_state(self, step_number: int) -> Tuple[bool, Dict[str, Any]]:
+        """Return (completed, data) for a step from a single workflow_data lookup"""
+        try:
+            if 1 <= step_number <= 8:
+                workflow_data = st.session_state.workflow_data
+                completed = bool(workflow_data.get('completion_mask', 0) & (1 << (step_number - 1)))
+                return completed, workflow_data.get(f'step_{step_number}_data', {})
+        except Exception as e:
+            st.error(f"Error retrieving state for step {step_number}: {str(e)}")
+        return False, {}
+
     def is_step_completed(self, step_number: int) -> bool:
         """Check if a specific step is completed"""
         try:
             if 1 <= step_number <= 8:
-                return st.session_state.workflow_data.get(f'step_{step_number}_completed', False)
+                return bool(st.session_state.workflow_data.get('completion_mask', 0) & (1 << (step_number - 1)))
         except Exception as e:
             st.error(f"Error checking completion status for step {step_number}: {str(e)}")
         return False
@@ -119,9 +267,7 @@ class StateManager:
     def get_progress_percentage(self) -> float:
         """Calculate overall workflow completion percentage"""
         try:
-            completed_steps = sum([
-                self.is_step_completed(i) for i in range(1, 9)
-            ])
+            completed_steps = bin(st.session_state.workflow_data.get('completion_mask', 0)).count('1')
             return (completed_steps / 8) * 100
         except Exception as e:
             st.error(f"Error calculating progress: {str(e)}")
@@ -160,9 +306,8 @@ class StateManager:
     def export_project_state(self) -> str:
         """Export current project state as JSON string"""
         try:
-            export_data = st.session_state.workflow_data.copy()
-            export_data['exported_at'] = datetime.now().isoformat()
-            return json.dumps(export_data, indent=2, default=str)
+            export_data = {**st.session_state.workflow_data, 'exported_at': datetime.now().isoformat()}
+            return serialization.dumps(export_data, indent=True).decode('utf-8')
         except Exception as e:
             st.error(f"Error exporting project state: {str(e)}")
             return "{}"
@@ -170,7 +315,7 @@ class StateManager:
     def import_project_state(self, json_data: str) -> bool:
         """Import project state from JSON string"""
         try:
-            imported_data = json.loads(json_data)
+            imported_data = serialization.loads(json_data)
 
             # Validate required fields
             required_fields = ['project_name', 'current_step']
@@ -180,19 +325,19 @@ class StateManager:
                     return False
 
             # Update session state
-            st.session_state.workflow_data.update(imported_data)
-            st.session_state.workflow_data['last_updated'] = datetime.now().isoformat()
+            migrate_completion_flags(imported_data)
+            st.session_state.workflow_data.update(imported_data, last_updated=datetime.now().isoformat())
 
             return True
 
-        except (json.JSONDecodeError, KeyError) as e:
+        except (ValueError, KeyError) as e:
             st.error(f"Error importing project state: {str(e)}")
             return False
 
     def reset_workflow(self):
         """Reset entire workflow to initial state"""
         try:
-            st.session_state.workflow_data = self.default_workflow_data.copy()
+            st.session_state.workflow_data = self._new_workflow_data()
         except Exception as e:
             st.error(f"Error resetting workflow: {str(e)}")
 
@@ -266,14 +411,15 @@ class StateManager:
     def get_workflow_summary(self) -> Dict[str, Any]:
         """Get a summary of the current workflow state"""
         try:
+            workflow_data = st.session_state.workflow_data
             return {
-                'project_name': st.session_state.workflow_data.get('project_name', 'Unnamed Project'),
+                'project_name': workflow_data.get('project_name', 'Unnamed Project'),
                 'current_step': self.get_current_step(),
                 'progress_percentage': self.get_progress_percentage(),
                 'steps_completed': sum([self.is_step_completed(i) for i in range(1, 9)]),
-                'selected_model': st.session_state.workflow_data.get('selected_model', 'N/A'),
-                'created_at': st.session_state.workflow_data.get('created_at', 'N/A'),
-                'last_updated': st.session_state.workflow_data.get('last_updated', 'N/A')
+                'selected_model': workflow_data.get('selected_model', 'N/A'),
+                'created_at': workflow_data.get('created_at', 'N/A'),
+                'last_updated': workflow_data.get('last_updated', 'N/A')
             }
         except Exception as e:
             st.error(f"Error getting workflow summary: {str(e)}")
@@ -286,3 +432,8 @@ class StateManager:
                 'created_at': 'N/A',
                 'last_updated': 'N/A'
             }
+
+@st.cache_resource(show_spinner=False)
+def get_state_manager() -> StateManager:
+    """Return the process-wide StateManager; it holds no per-session data itself"""
+    return StateManager()